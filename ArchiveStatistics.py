@@ -0,0 +1,552 @@
+"""
+	====================================================================================
+	Whole-archive Ramachandran statistics, e.g. across a local PDB mirror. Structures
+	are streamed one at a time and their dihedral angles accumulated into fixed-size
+	arrays, so memory does not grow with the size of the archive:
+	 - 2D phi/psi histograms per residue class and per residue type
+	 - Favoured/Allowed/Outlier counts per residue class, per resolution range and per
+	   experimental method (scored against the Top8000 reference for each class)
+
+	Statistics are saved as .npz files, along with the lists of files already counted
+	and of files that failed. Runs can be checkpointed and resumed (retrying failed
+	files), and archives split into shards which are processed independently and merged
+	afterwards:
+
+		python ArchiveStatistics.py aggregate /data/pdb -o shard0.npz --shard 0/4
+		python ArchiveStatistics.py merge -o archive.npz shard0.npz shard1.npz ...
+		python ArchiveStatistics.py summary archive.npz
+
+	Author information:
+	 - Joseph I. J. Ellaway
+	 - josephellaway@gmail.com
+	 - https://github.com/Joseph-Ellaway
+	====================================================================================
+"""
+
+import argparse
+import os
+import sys
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from DihedralCalculator import (ModelsDihedrals, ParseModels, PDBCode, RamachandranError,
+												ReadPDBLines, Selection)
+from PlotterFunctions import CONTOUR_LEVEL_INNER, CONTOUR_LEVEL_OUTER, ScoreAngles
+from RamaArgumentParser import VerboseStatement
+from ReferenceLibrary import LoadReferenceData, SharedReferenceData
+
+
+# Residue classes assigned by AminoAcidType()
+RESIDUE_CLASSES = ["General", "Glycine", "Proline", "Pre-proline", "Ile-Val"]
+
+# Canonical residues counted by AminoAcidType()
+RESIDUE_NAMES = ["ALA", "ARG", "ASN", "ASP", "CYS", "GLN", "GLU", "GLY", "HIS", "ILE",
+				"LEU", "LYS", "MET", "PHE", "PRO", "SER", "THR", "TRP", "TYR", "VAL"]
+
+# Regions returned by ScoreAngles()
+REGIONS = ["Favoured", "Allowed", "Outlier"]
+
+# Experimental methods (EXPDTA records). Any other method is counted as OTHER.
+METHODS = ["X-RAY DIFFRACTION", "SOLUTION NMR", "SOLID-STATE NMR", "ELECTRON MICROSCOPY",
+			"ELECTRON CRYSTALLOGRAPHY", "NEUTRON DIFFRACTION", "FIBER DIFFRACTION",
+			"OTHER", "UNKNOWN"]
+
+# Resolution ranges (Angstroms). Structures without a resolution use the last row.
+RESOLUTION_EDGES = [0.0, 1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0, np.inf]
+
+# Histogram bins along each angle axis (2 degree bins)
+ANGLE_BINS = 180
+
+# File extensions read from an archive
+PDB_EXTENSIONS = (".pdb", ".ent", ".pdb.gz", ".ent.gz")
+
+
+
+def NewStatistics(all_models=False):
+	"""
+	====================================================================================
+	Returns an empty set of archive statistics: a dictionary of fixed-size count arrays
+	plus the (initially empty) arrays of files already counted and of files that failed,
+	and whether every model of each file is counted or only the first.
+	====================================================================================
+	"""
+
+	n_resolutions = len(RESOLUTION_EDGES)		# Ranges plus "unknown"
+
+	return {
+		"class_histograms" : np.zeros((len(RESIDUE_CLASSES), ANGLE_BINS, ANGLE_BINS),
+																	dtype=np.int64),
+		"residue_histograms" : np.zeros((len(RESIDUE_NAMES), ANGLE_BINS, ANGLE_BINS),
+																	dtype=np.int64),
+		"class_regions" : np.zeros((len(RESIDUE_CLASSES), len(REGIONS)), dtype=np.int64),
+		"resolution_regions" : np.zeros((n_resolutions, len(REGIONS)), dtype=np.int64),
+		"method_regions" : np.zeros((len(METHODS), len(REGIONS)), dtype=np.int64),
+		"file_counts" : np.zeros(2, dtype=np.int64),		# Counted, failed
+		"processed" : np.array([], dtype=str),
+		"failed" : np.array([], dtype=str),
+		"all_models" : np.array([all_models])
+		}
+
+
+
+def StatisticsLayout():
+	"""
+	====================================================================================
+	Labels describing the shape of the statistics arrays. Saved with the statistics and
+	checked before merging, so files made with different settings are never combined.
+	====================================================================================
+	"""
+
+	return {
+		"layout_classes" : np.array(RESIDUE_CLASSES),
+		"layout_residues" : np.array(RESIDUE_NAMES),
+		"layout_regions" : np.array(REGIONS),
+		"layout_methods" : np.array(METHODS),
+		"layout_resolutions" : np.array(RESOLUTION_EDGES),
+		"layout_bins" : np.array([ANGLE_BINS])
+		}
+
+
+
+def SaveStatistics(stats, out_file_name):
+	"""
+	====================================================================================
+	Saves statistics as an .npz file. Written under a temporary name and then renamed,
+	so an interrupted save never replaces a good checkpoint.
+	====================================================================================
+	"""
+
+	tmp_file_name = str(out_file_name + ".tmp.npz")
+
+	np.savez_compressed(tmp_file_name, **stats, **StatisticsLayout())
+	os.replace(tmp_file_name, out_file_name)
+
+
+
+def LoadStatistics(file_name):
+	"""
+	====================================================================================
+	Loads statistics saved by SaveStatistics(). Raises RamachandranError if they were
+	made with a different layout (classes, bins, methods or resolution ranges), or
+	without every array of NewStatistics() (e.g. the model policy, all_models).
+	====================================================================================
+	"""
+
+	with np.load(file_name, allow_pickle=False) as saved:
+		for key, expected in StatisticsLayout().items():
+			if key not in saved or not np.array_equal(saved[key], expected):
+				raise RamachandranError(str("Incompatible statistics file: " + file_name))
+
+		stats = NewStatistics()
+
+		if any(key not in saved for key in stats):
+			raise RamachandranError(str("Incompatible statistics file: " + file_name))
+
+		for key in stats:
+			stats[key] = saved[key]
+
+	return stats
+
+
+
+def MergeStatistics(stats_list):
+	"""
+	====================================================================================
+	Combines statistics from independently processed shards by summing their counts.
+	Files that failed in any shard are kept, so they can still be retried. Raises
+	RamachandranError if a file appears in more than one shard, or if shards counted
+	models differently (all_models).
+	====================================================================================
+	"""
+
+	all_models = {bool(stats["all_models"][0]) for stats in stats_list}
+
+	if len(all_models) > 1:
+		raise RamachandranError("Statistics count models differently: some shards used "
+														"--all_models, others did not")
+
+	merged = NewStatistics(all_models.pop() if all_models else False)
+
+	for stats in stats_list:
+		for key in merged:
+			if key not in ["processed", "failed", "all_models"]:
+				merged[key] = merged[key] + stats[key]
+
+	merged["processed"] = np.concatenate([stats["processed"] for stats in stats_list])
+	merged["failed"] = np.concatenate([stats["failed"] for stats in stats_list])
+
+	all_files = np.concatenate([merged["processed"], merged["failed"]])
+
+	if len(np.unique(all_files)) != len(all_files):
+		raise RamachandranError("Statistics share files: shards overlap")
+
+	return merged
+
+
+
+def ArchiveFiles(archive_dir, shard_index=0, n_shards=1):
+	"""
+	====================================================================================
+	Lists PDB files under an archive directory (relative paths, sorted). Files are split
+	between n_shards shards by a hash of their path, so each shard always holds the same
+	files however often it is listed.
+	====================================================================================
+	"""
+
+	file_names = []
+
+	for dir_path, dir_names, dir_files in os.walk(archive_dir):
+		dir_names.sort()
+
+		for file_name in sorted(dir_files):
+			if not file_name.lower().endswith(PDB_EXTENSIONS):
+				continue
+
+			relative_name = os.path.relpath(os.path.join(dir_path, file_name), archive_dir)
+
+			if zlib.crc32(relative_name.encode("utf-8")) % n_shards == shard_index:
+				file_names.append(relative_name)
+
+	return file_names
+
+
+
+def HeaderRecords(pdb_lines, header):
+	"""
+	====================================================================================
+	Passes the lines of a PDB file through unchanged, recording its experimental method
+	(EXPDTA) and resolution (REMARK 2) in the header dictionary as they go by.
+	====================================================================================
+	"""
+
+	for line in pdb_lines:
+		record = line[:6]
+
+		if record == "EXPDTA" and "method" not in header:
+			header["method"] = line[10:].split(";")[0].strip().upper()
+
+		elif record == "REMARK" and line[7:10] == "  2" and "RESOLUTION." in line:
+			try:
+				header["resolution"] = float(line[23:30])
+			except ValueError:
+				pass			# e.g. NOT APPLICABLE
+
+		yield line
+
+
+
+def ClassifyHeader(header):
+	"""
+	====================================================================================
+	Returns the (resolution row, method row) of a file's header in the region count
+	arrays.
+	====================================================================================
+	"""
+
+	resolution = header.get("resolution")
+
+	if resolution is None:
+		resolution_row = len(RESOLUTION_EDGES) - 1
+	else:
+		resolution_row = int(np.searchsorted(RESOLUTION_EDGES, resolution, side="right")) - 1
+		resolution_row = min(max(resolution_row, 0), len(RESOLUTION_EDGES) - 2)
+
+	method = header.get("method")
+
+	if method is None:
+		method_row = METHODS.index("UNKNOWN")
+	elif method in METHODS:
+		method_row = METHODS.index(method)
+	else:
+		method_row = METHODS.index("OTHER")
+
+	return resolution_row, method_row
+
+
+
+def AngleCells(angles):
+	"""
+	=================================================================
+	Maps angles (degrees, -180 to 180) onto histogram bin indices.
+	=================================================================
+	"""
+
+	cells = np.floor((np.asarray(angles, dtype=np.float64) + 180.0) / 360.0 * ANGLE_BINS)
+
+	return np.clip(cells, 0, ANGLE_BINS - 1).astype(np.int64)
+
+
+
+def AccumulateDihedrals(stats, userpdb_df, header, references):
+	"""
+	====================================================================================
+	Adds the dihedral angles of one file (as returned by ExtractDihedrals) to the
+	statistics. references maps residue class to its ReferenceData.
+	====================================================================================
+	"""
+
+	userpdb_df = userpdb_df.dropna()
+	userpdb_df = userpdb_df.loc[userpdb_df["type"].isin(RESIDUE_CLASSES)]
+
+	phi_cells = AngleCells(userpdb_df["phi"])
+	psi_cells = AngleCells(userpdb_df["psi"])
+	angle_cells = phi_cells * ANGLE_BINS + psi_cells
+	n_cells = ANGLE_BINS * ANGLE_BINS
+
+	class_rows = pd.Categorical(userpdb_df["type"], 
+								categories=RESIDUE_CLASSES).codes.astype(np.int64)
+	residue_rows = pd.Categorical(userpdb_df["residueName"], 
+								categories=RESIDUE_NAMES).codes.astype(np.int64)
+
+	stats["class_histograms"] += np.bincount(class_rows * n_cells + angle_cells,
+								minlength=stats["class_histograms"].size).reshape(
+												stats["class_histograms"].shape)
+
+	known = residue_rows >= 0
+	stats["residue_histograms"] += np.bincount(residue_rows[known] * n_cells
+								+ angle_cells[known],
+								minlength=stats["residue_histograms"].size).reshape(
+												stats["residue_histograms"].shape)
+
+	# Score each class against its own reference, as in its Ramachandran plot
+	region_rows = np.zeros(len(userpdb_df), dtype=np.int64)
+
+	for class_row, residue_class in enumerate(RESIDUE_CLASSES):
+		in_class = class_rows == class_row
+
+		if not in_class.any():
+			continue
+
+		reference = references[residue_class]
+		density, regions = ScoreAngles(userpdb_df["phi"].to_numpy(dtype=float)[in_class],
+										userpdb_df["psi"].to_numpy(dtype=float)[in_class],
+										reference.contour_counts, reference.phi_edges,
+										reference.psi_edges, 
+										CONTOUR_LEVEL_INNER, CONTOUR_LEVEL_OUTER)
+		region_rows[in_class] = pd.Categorical(regions, categories=REGIONS).codes
+
+	region_counts = np.bincount(class_rows * len(REGIONS) + region_rows,
+						minlength=stats["class_regions"].size).reshape(
+												stats["class_regions"].shape)
+	stats["class_regions"] += region_counts
+
+	resolution_row, method_row = ClassifyHeader(header)
+	stats["resolution_regions"][resolution_row] += region_counts.sum(axis=0)
+	stats["method_regions"][method_row] += region_counts.sum(axis=0)
+
+
+
+def AggregateArchive(archive_dir, out_file_name, shard_index=0, n_shards=1, resume=False,
+						checkpoint_every=100, all_models=False, shared_reference=None,
+						verb=False):
+	"""
+	====================================================================================
+	Streams over the PDB files of an archive (or one shard of it), accumulating their
+	dihedral angles into statistics saved to out_file_name. Statistics are checkpointed
+	every checkpoint_every files. With resume, statistics already in out_file_name are
+	loaded and the files they counted are skipped. Only the first model of each file is
+	counted unless all_models is set. Files which cannot be read or parsed are reported,
+	saved as failed and retried by the next resume.
+	====================================================================================
+	"""
+
+	if resume and os.path.exists(out_file_name):
+		stats = LoadStatistics(out_file_name)
+
+		if bool(stats["all_models"][0]) != all_models:
+			raise RamachandranError(str("Cannot resume " + out_file_name + ": it was made "
+										+ ("with" if stats["all_models"][0] else "without") 
+										+ " --all_models"))
+
+		VerboseStatement(verb, str("Resuming from " + str(len(stats["processed"]))
+																	+ " files"))
+	else:
+		stats = NewStatistics(all_models)
+
+	if shared_reference:
+		references = {residue_class : SharedReferenceData(shared_reference, residue_class)
+											for residue_class in RESIDUE_CLASSES}
+	else:
+		VerboseStatement(verb, "Importing Top8000 library")
+		references = {residue_class : LoadReferenceData(residue_class)
+											for residue_class in RESIDUE_CLASSES}
+
+	selection = Selection() if all_models else Selection(models=((0, 0),))
+
+	# Files that failed before are not in processed, so they are tried again
+	done = set(stats["processed"].tolist())
+	failed = set(stats["failed"].tolist())
+	file_names = [name for name in ArchiveFiles(archive_dir, shard_index, n_shards)
+															if name not in done]
+	new_files = []
+
+	VerboseStatement(verb, str(str(len(file_names)) + " files to process"))
+
+	for count, file_name in enumerate(file_names, start=1):
+
+		header = {}
+
+		try:
+			pdb_lines = HeaderRecords(ReadPDBLines(os.path.join(archive_dir, file_name)),
+																			header)
+			models = ParseModels(pdb_lines, PDBCode(file_name), selection)
+			userpdb_df = ModelsDihedrals(models, PDBCode(file_name), selection)
+
+			AccumulateDihedrals(stats, userpdb_df, header, references)
+			stats["file_counts"][0] += 1
+
+			new_files.append(file_name)
+			failed.discard(file_name)
+
+		# Any failure is specific to this file, so report it rather than stop the archive
+		except Exception as error:
+			print(str("[" + str(count) + "/" + str(len(file_names)) + "] FAILED " 
+							+ file_name + ": " + type(error).__name__ + ": " + str(error)))
+			failed.add(file_name)
+
+		if count % checkpoint_every == 0 or count == len(file_names):
+			stats["processed"] = np.concatenate([stats["processed"], 
+														np.array(new_files, dtype=str)])
+			stats["failed"] = np.array(sorted(failed), dtype=str)
+			stats["file_counts"][1] = len(failed)
+			new_files = []
+			SaveStatistics(stats, out_file_name)
+			VerboseStatement(verb, str("Checkpoint: " + str(count) + "/"
+														+ str(len(file_names)) + " files"))
+
+	if not file_names:
+		SaveStatistics(stats, out_file_name)
+
+	return stats
+
+
+
+def SummariseStatistics(stats):
+	"""
+	====================================================================================
+	Returns DataFrames of residue counts and outlier rates per residue class, resolution
+	range and experimental method.
+	====================================================================================
+	"""
+
+	resolution_labels = [str(RESOLUTION_EDGES[i]) + "-" + str(RESOLUTION_EDGES[i + 1])
+										for i in range(len(RESOLUTION_EDGES) - 1)]
+	resolution_labels.append("Unknown")
+
+	summaries = {}
+
+	for name, key, labels in [("class", "class_regions", RESIDUE_CLASSES),
+								("resolution", "resolution_regions", resolution_labels),
+								("method", "method_regions", METHODS)]:
+
+		summary = pd.DataFrame(stats[key], index=labels, columns=REGIONS)
+		totals = summary.sum(axis=1)
+		summary["Residues"] = totals
+		summary["OutlierRate"] = (summary["Outlier"] / totals.where(totals > 0)).round(4)
+		summaries[name] = summary.loc[totals > 0]
+
+	return summaries
+
+
+
+def CollectArchiveArgs():
+	"""
+	====================================================================================
+	Collects the aggregate, merge and summary subcommands' arguments from the command
+	line.
+	====================================================================================
+	"""
+
+	parser = argparse.ArgumentParser()
+	subparsers = parser.add_subparsers(dest="command", required=True)
+
+	aggregate = subparsers.add_parser("aggregate",
+						help="Accumulate statistics over the PDB files of an archive.")
+
+	aggregate.add_argument("archive_dir", help="Directory of PDB files (searched recursively).",
+						type=str)
+
+	aggregate.add_argument("-o", "--out", help="Statistics file to write (.npz).",
+						type=str, required=True)
+
+	aggregate.add_argument("--shard",
+						help="Process one shard of the archive, as <index>/<count> (e.g. 0/4).",
+						type=str, default="0/1")
+
+	aggregate.add_argument("--resume",
+						help="Continue from the statistics already in the out file.",
+						action="store_true")
+
+	aggregate.add_argument("--checkpoint_every",
+						help="Files between checkpoints (default: 100).",
+						type=int, default=100)
+
+	aggregate.add_argument("--all_models",
+						help="Count every model of each file (default: first model only).",
+						action="store_true")
+
+	aggregate.add_argument("--shared_reference",
+						help="Reference data file published by ReferenceLibrary.py.",
+						type=str)
+
+	aggregate.add_argument("-v", "--verbose", help="Increase output verbosity",
+						action="store_true")
+
+	merge = subparsers.add_parser("merge", help="Combine statistics of several shards.")
+
+	merge.add_argument("parts", nargs="+", help="Statistics files to combine.", type=str)
+
+	merge.add_argument("-o", "--out", help="Statistics file to write (.npz).",
+						type=str, required=True)
+
+	summary = subparsers.add_parser("summary",
+						help="Print residue counts and outlier rates.")
+
+	summary.add_argument("stats", help="Statistics file (.npz).", type=str)
+
+	return parser.parse_args()
+
+
+
+if __name__ == "__main__":
+
+	args = CollectArchiveArgs()
+
+	try:
+		if args.command == "aggregate":
+			try:
+				shard_index, n_shards = [int(part) for part in args.shard.split("/")]
+			except ValueError:
+				raise RamachandranError(str("Invalid shard: " + args.shard))
+
+			if not 0 <= shard_index < n_shards:
+				raise RamachandranError(str("Invalid shard: " + args.shard))
+
+			stats = AggregateArchive(args.archive_dir, args.out, shard_index, n_shards,
+									resume=args.resume,
+									checkpoint_every=args.checkpoint_every,
+									all_models=args.all_models,
+									shared_reference=args.shared_reference,
+									verb=args.verbose)
+
+			print("Done. \n", int(stats["file_counts"][0]), "files counted,",
+					int(stats["file_counts"][1]), "failed (retried by --resume). Statistics "
+					"saved to", args.out)
+
+		elif args.command == "merge":
+			stats = MergeStatistics([LoadStatistics(part) for part in args.parts])
+			SaveStatistics(stats, args.out)
+
+			print("Done. \n", len(stats["processed"]), "files. Statistics saved to",
+																		args.out)
+
+		else:
+			for name, summary in SummariseStatistics(LoadStatistics(args.stats)).items():
+				print(str("\n" + name.capitalize() + ":"))
+				print(summary.to_string())
+
+	except RamachandranError as error:
+		print("\n  ERROR:", error, "\n")
+		sys.exit(1)
@@ -0,0 +1,305 @@
+"""
+	====================================================================================
+	Asynchronous batch driver for plotting many PDB files, e.g. for QC of structures on
+	slow (network-mounted) storage. Each file passes through a pipeline of stages:
+
+		read/decompress -> parse -> dihedral compute -> render -> write
+
+	Stages are connected by bounded asyncio queues. Blocking work runs in executors:
+	file reads, decompression and writes in an I/O thread pool, parsing, compute and
+	rendering in a worker pool. While one file is being computed the next ones are
+	already being read, so storage latency is hidden behind compute. When a downstream
+	stage falls behind its input queue fills up and upstream stages wait
+	(backpressure), so only a bounded number of files is held in memory at once.
+
+	Usage:
+		python BatchPlotter.py structures/*.pdb.gz --out_dir plots/ --readers 8
+
+	Author information:
+	 - Joseph I. J. Ellaway
+	 - josephellaway@gmail.com
+	 - https://github.com/Joseph-Ellaway
+	====================================================================================
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from DihedralCalculator import (ModelsDihedrals, ParseModels, ParseSelection, PDBCode,
+											RamachandranError, ReadPDBText, Selection)
+from RamachandranPlotter import (PLOT_TYPES, CheckFileType, LoadReferenceData, OutFileName,
+								PlotDihedrals, SharedReferenceData, WriteResult)
+
+
+# Marks the end of a stage's input
+_END = None
+
+
+
+def BatchProgress(progress, verbose=False):
+	"""
+	====================================================================================
+	Default progress report: prints a line per finished file with running totals.
+	Failures are always reported, successes only if verbose.
+	====================================================================================
+	"""
+
+	error = progress["error"]
+
+	if error is not None:
+		# Unexpected errors are named, as their message alone may not identify them
+		if not isinstance(error, RamachandranError):
+			error = str(type(error).__name__ + ": " + str(error))
+
+		print(str("[" + str(progress["finished"]) + "/" + str(progress["total"]) + "] "
+				+ "FAILED " + progress["file"] + ": " + str(error)))
+
+	elif verbose:
+		print(str("[" + str(progress["finished"]) + "/" + str(progress["total"]) + "] "
+				+ progress["file"] + " " + str(progress["scores"])
+				+ " (queued: " + str(progress["queued"]) + ")"))
+
+
+
+async def RunStage(function, executor, in_queue, out_queue, n_workers, on_error):
+	"""
+	====================================================================================
+	Runs n_workers tasks which take items from in_queue, apply function to them in an
+	executor and put the results on out_queue. Items that raise an error are reported
+	with on_error and dropped, so one bad file never stops the batch. Once every worker
+	has seen the end of the input, the end marker is passed on to the next stage.
+	====================================================================================
+	"""
+
+	loop = asyncio.get_running_loop()
+
+	async def Worker():
+		while True:
+			item = await in_queue.get()
+
+			# Leave the end marker for the stage's other workers
+			if item is _END:
+				await in_queue.put(_END)
+				return
+
+			try:
+				item["data"] = await loop.run_in_executor(executor, function, item)
+			# Any failure is specific to this file, so report it and carry on
+			except Exception as error:
+				on_error(item, error)
+				continue
+
+			await out_queue.put(item)
+
+	await asyncio.gather(*[Worker() for _ in range(n_workers)])
+
+	await out_queue.put(_END)
+
+
+
+async def RunBatch(pdb_files, out_dir="./", plot_type=0, file_type="png", save=False,
+					selection=Selection(), readers=4, workers=None, writers=2, 
+					queue_size=8, progress=BatchProgress, **plot_kwargs):
+	"""
+	====================================================================================
+	Plots every file in pdb_files through the staged pipeline, writing each plot (and
+	optionally CSV) to out_dir. Only the models, chains and residues in selection (a 
+	Selection) are read. readers, workers and writers set the concurrency of the
+	read, compute/render and write stages, queue_size bounds each queue between stages.
+	progress is called with a dictionary describing each finished file. plot_kwargs are
+	passed to PlotDihedrals().
+
+	Returns a dictionary of file name to scores, or to the error raised for that file.
+	Raises RamachandranError before reading any file if file_type is invalid.
+	====================================================================================
+	"""
+
+	CheckFileType(file_type)
+
+	workers = workers or os.cpu_count() or 1
+	plot_type_name = PLOT_TYPES[int(plot_type)]
+
+	queues = [asyncio.Queue(maxsize=queue_size) for _ in range(6)]
+	read_queue, parse_queue, compute_queue, render_queue, write_queue, done_queue = queues
+
+	outcomes = {}
+
+	def Report(item, scores=None, error=None):
+		outcomes[item["file"]] = error if error is not None else scores
+		progress({
+			"file" : item["file"],
+			"finished" : len(outcomes),
+			"total" : len(pdb_files),
+			"scores" : scores,
+			"error" : error,
+			"queued" : [queue.qsize() for queue in queues[:-1]]
+			})
+
+	def OnError(item, error):
+		Report(item, error=error)
+
+	def Read(item):
+		return ReadPDBText(item["file"])
+
+	def Parse(item):
+		return list(ParseModels(item["data"].splitlines(keepends=True), item["code"], 
+																			selection))
+
+	def Compute(item):
+		return ModelsDihedrals(item["data"], item["code"], selection)
+
+	def Render(item):
+		return PlotDihedrals(item["data"], plot_type=plot_type, file_type=file_type,
+																		**plot_kwargs)
+
+	def Write(item):
+		plot_name = OutFileName(os.path.basename(item["file"]), out_dir, plot_type_name)
+		WriteResult(item["data"], plot_name, save)
+		return item["data"].scores
+
+	async def Feed():
+		for pdb_file in pdb_files:
+			await read_queue.put({"file" : pdb_file, "code" : PDBCode(pdb_file)})
+		await read_queue.put(_END)
+
+	async def Finish():
+		while True:
+			item = await done_queue.get()
+			if item is _END:
+				return
+			Report(item, scores=item["data"])
+
+	io_pool = ThreadPoolExecutor(max_workers=readers + writers)
+	worker_pool = ThreadPoolExecutor(max_workers=workers)
+
+	try:
+		# Build the shared reference data once, before any render needs it
+		if plot_kwargs.get("reference") is None:
+			await asyncio.get_running_loop().run_in_executor(worker_pool, LoadReferenceData,
+										plot_type_name, plot_kwargs.get("background_colour", "Blues"))
+
+		await asyncio.gather(
+			Feed(),
+			RunStage(Read, io_pool, read_queue, parse_queue, readers, OnError),
+			RunStage(Parse, worker_pool, parse_queue, compute_queue, workers, OnError),
+			RunStage(Compute, worker_pool, compute_queue, render_queue, workers, OnError),
+			RunStage(Render, worker_pool, render_queue, write_queue, workers, OnError),
+			RunStage(Write, io_pool, write_queue, done_queue, writers, OnError),
+			Finish(),
+			)
+
+	finally:
+		io_pool.shutdown(wait=True)
+		worker_pool.shutdown(wait=True)
+
+	return outcomes
+
+
+
+def BatchPlot(pdb_files, **kwargs):
+	"""
+	====================================================================================
+	Synchronous wrapper around RunBatch(), for use outside of an asyncio event loop.
+	====================================================================================
+	"""
+
+	return asyncio.run(RunBatch(pdb_files, **kwargs))
+
+
+
+def CollectBatchArgs():
+	"""
+	====================================================================================
+	Collects the batch driver's input arguments from the command line.
+	====================================================================================
+	"""
+
+	parser = argparse.ArgumentParser()
+
+	parser.add_argument("pdb_files", nargs="+",
+						help="PDB files to plot (may be gzipped).")
+
+	parser.add_argument("-v", "--verbose", help="Report every finished file.",
+						action="store_true")
+
+	parser.add_argument("-d", "--out_dir",
+						help="Out directory. Must be available before-hand.",
+						type=str, default="./")
+
+	parser.add_argument("-t", "--plot_type",
+						help="Type of angles plotted on Ramachandran diagram. Refer to README.md for options and details.",
+						type=int, default=0, choices=range(len(PLOT_TYPES)))
+
+	parser.add_argument("-f", "--file_type",
+						help="File type for output plots. Options: PNG (default, 96 dpi), PDF, SVG, EPS and PS.",
+						type=str, default="png")
+
+	parser.add_argument("-s", "--save_csv",
+						help="Save calculated dihedral angles in separate CSVs.",
+						action="store_true")
+
+	parser.add_argument("--select",
+						help="Models, chains and residues to plot, e.g. \"chain A and resi 10-50\". Refer to README.md for details.",
+						type=str)
+
+	parser.add_argument("--shared_reference",
+						help="Reference data file published by ReferenceLibrary.py, shared between processes.",
+						type=str)
+
+	parser.add_argument("--readers", help="Concurrent file reads (default: 4).",
+						type=int, default=4)
+
+	parser.add_argument("--workers",
+						help="Parse/compute/render threads (default: number of CPUs).",
+						type=int, default=None)
+
+	parser.add_argument("--writers", help="Concurrent file writes (default: 2).",
+						type=int, default=2)
+
+	parser.add_argument("--queue_size",
+						help="Files held between each pair of stages (default: 8).",
+						type=int, default=8)
+
+	return parser.parse_args()
+
+
+
+if __name__ == "__main__":
+
+	args = CollectBatchArgs()
+
+	start_time = time.time()
+
+	try:
+		CheckFileType(args.file_type)
+
+		selection = ParseSelection(args.select) if args.select else Selection()
+
+		if args.shared_reference:
+			reference = SharedReferenceData(args.shared_reference, PLOT_TYPES[args.plot_type])
+		else:
+			reference = None
+
+	except RamachandranError as error:
+		print("\n  ERROR:", error, "\n")
+		sys.exit(1)
+
+	outcomes = BatchPlot(args.pdb_files, out_dir=args.out_dir, plot_type=args.plot_type,
+						file_type=args.file_type.lower(), save=args.save_csv, 
+						selection=selection, reference=reference,
+						readers=args.readers, workers=args.workers, writers=args.writers,
+						queue_size=args.queue_size,
+						progress=lambda report: BatchProgress(report, args.verbose))
+
+	n_failed = sum(isinstance(outcome, Exception) for outcome in outcomes.values())
+
+	print(str("Done. " + str(len(outcomes) - n_failed) + " plotted, " + str(n_failed)
+			+ " failed in " + str(round(time.time() - start_time, 1)) + " s. \n"
+			+ " Ramachandran plots saved to " + args.out_dir))
+
+	if n_failed:
+		sys.exit(1)
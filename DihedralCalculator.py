@@ -24,13 +24,86 @@ import warnings
 
 warnings.filterwarnings("ignore")
 
+import gzip
+import io
 import math
+import re
+import zlib
+from dataclasses import dataclass
 
 import Bio.PDB
 import numpy as np
 import pandas as pd
 
 
+
+class RamachandranError(Exception):
+	"""
+	=====================================================================
+	Base class for errors raised while calculating or plotting dihedrals.
+	=====================================================================
+	"""
+
+
+
+class PDBFileError(RamachandranError):
+	"""
+	==========================================================
+	Raised when no PDB file is given, or it cannot be parsed.
+	==========================================================
+	"""
+
+
+
+class ModelNumberError(RamachandranError):
+	"""
+	===================================================
+	Raised when a model number is not in the PDB file.
+	===================================================
+	"""
+
+
+
+class ChainIDError(RamachandranError):
+	"""
+	=============================================
+	Raised when a chain ID is not in a PDB model.
+	=============================================
+	"""
+
+
+
+class SelectionError(RamachandranError):
+	"""
+	=======================================
+	Raised when a selection cannot be read.
+	=======================================
+	"""
+
+
+
+# Only backbone atoms are needed to calculate phi/psi angles
+BACKBONE_ATOMS = {"N", "CA", "C"}
+
+
+
+@dataclass(frozen=True)
+class Selection:
+	"""
+	====================================================================================
+	Models, chains and residues to read from a PDB file. Each field is None to select 
+	everything, otherwise:
+		- models : Tuple of inclusive (first, last) model numbers (order in PDB file, 
+		           starting at 0)
+		- chains : Frozenset of chain IDs
+		- residues : Tuple of inclusive (first, last) residue numbers
+	====================================================================================
+	"""
+	models: tuple = None
+	chains: frozenset = None
+	residues: tuple = None
+
+
 def ResidueNames(chain):
 	"""
 	====================================================================================
@@ -68,8 +141,8 @@ def ToDegrees(radian_list):
 		try:
 			degrees = math.degrees(i)
 			out_list.append(degrees)
-		except:
-			out_list.append(np.nan)  # Handles NaN values
+		except TypeError:
+			out_list.append(np.nan)  # Handles missing (None) angles
 
 	return out_list
 
@@ -163,7 +236,7 @@ def AminoAcidType(residue_names):
 					aa_type = "Pre-proline"
 				else:
 					pass
-			except:
+			except IndexError:
 				pass
 		else:
 			aa_type = np.nan
@@ -237,7 +310,11 @@ def ModelDihedrals(model, model_num, iter_chains=True, chain_id=None):
 
 	# If multiple chains are present, default: calculate dihedrals from all chains
 	else:
-		chain = model[chain_id]
+		try:
+			chain = model[chain_id]
+		except KeyError:
+			raise ChainIDError(str("Chain " + str(chain_id) + " not found in model " 
+																	+ str(model_num)))
 		chain_summaryDF = ChainSummary(chain)
 		model_summaryDF = pd.concat([model_summaryDF, chain_summaryDF], ignore_index=True)
 
@@ -249,65 +326,366 @@ def ModelDihedrals(model, model_num, iter_chains=True, chain_id=None):
 
 
 
-def ExtractDihedrals(pdb_file_name=None, iter_models=True, model_number=0, 
-													iter_chains=True, chain_id=None):
+def PDBCode(pdb_file_name):
 	"""
 	====================================================================================
-	Generates a Pandas DataFrame of phi/psi angles (and other information) from a given 
-	PDB file 
+	Returns the PDB code used to label a file's dihedral angles: the file name without 
+	its extension (and without .gz if compressed). 
 	====================================================================================
 	"""
-	inv_model = False
 
-	# User parsed in a PDB file name
-	if pdb_file_name != None:
+	if pdb_file_name.lower().endswith(".gz"):
+		pdb_file_name = pdb_file_name[:-3]
 
-		# Attempts to extract information from PDB file
-		try:
-			pdb_code = pdb_file_name[:-4]
-			pdb_summaryDF = pd.DataFrame(columns=["ModelID","chainID","residueName",
-													"residueIndex","phi","psi","type"])
+	return pdb_file_name[:-4]
 
-			# User did not parse in specific model: Iterate over all models in PDB object
-			if iter_models:
 
-				models = Bio.PDB.PDBParser().get_structure(pdb_code, pdb_file_name)
 
-				for model in models:
+def ReadPDBText(pdb_file_name):
+	"""
+	====================================================================================
+	Reads a PDB file into a string, decompressing it if gzipped. 
+	====================================================================================
+	"""
 
-					model_dihedrals = ModelDihedrals(model, model_number, iter_chains, chain_id)
-					pdb_summaryDF = pd.concat([pdb_summaryDF, model_dihedrals], ignore_index=True)
+	try:
+		with open(pdb_file_name, "rb") as pdb_file:
+			pdb_bytes = pdb_file.read()
 
-					model_number += 1
+		# Gzip magic number
+		if pdb_bytes[:2] == b"\x1f\x8b":
+			pdb_bytes = gzip.decompress(pdb_bytes)
 
-			# Specific model number parsed in by user
-			else:
+	# Truncated or corrupt gzip files raise EOFError or zlib.error when decompressed
+	except (OSError, EOFError, zlib.error) as error:
+		raise PDBFileError(str("Invalid PDB file: " + str(pdb_file_name))) from error
+
+	return pdb_bytes.decode("utf-8", errors="replace")
+
+
+
+def ParseRanges(text):
+	"""
+	====================================================================================
+	Reads comma separated integers and inclusive ranges (e.g. "1,5-10,-3--1") into a 
+	tuple of (first, last) pairs. 
+	====================================================================================
+	"""
+
+	ranges = []
+
+	for part in text.split(","):
+		match = re.fullmatch(r"\s*(-?\d+)\s*(?:-\s*(-?\d+)\s*)?", part)
+
+		if match is None:
+			raise SelectionError(str("Invalid range: " + part.strip()))
+
+		first = int(match.group(1))
+		last = int(match.group(2)) if match.group(2) is not None else first
+
+		if last < first:
+			raise SelectionError(str("Invalid range: " + part.strip()))
+
+		ranges.append((first, last))
+
+	return tuple(ranges)
+
+
+
+def ParseSelection(text):
+	"""
+	====================================================================================
+	Reads a selection of models, chains and residues, e.g.:
+
+		model 0-4 and chain A,B and resi 10-50,60
+
+	Terms are joined by "and" and each keyword may appear once:
+		- model / models : Model numbers or ranges (order in PDB file, starting at 0)
+		- chain / chains : Chain IDs
+		- resi / residues : Residue numbers or ranges
+
+	Returns a Selection. 
+	====================================================================================
+	"""
+
+	fields = {}
+	keywords = {"model" : "models", "models" : "models", "chain" : "chains", 
+				"chains" : "chains", "resi" : "residues", "residues" : "residues"}
+
+	for term in re.split(r"\s+and\s+", text.strip()):
+		keyword, _, values = term.strip().partition(" ")
+		field = keywords.get(keyword.lower())
+
+		if field is None or not values.strip():
+			raise SelectionError(str("Invalid selection term: " + term.strip()))
+
+		if field in fields:
+			raise SelectionError(str("Selection keyword given twice: " + keyword))
+
+		if field == "chains":
+			fields[field] = frozenset(chain.strip() for chain in values.split(","))
+		else:
+			fields[field] = ParseRanges(values)
+
+	return Selection(**fields)
+
+
+
+def InRanges(value, ranges):
+	"""
+	=====================================================================
+	Checks whether an integer falls within any of the (first, last) pairs.
+	=====================================================================
+	"""
+
+	for first, last in ranges:
+		if first <= value <= last:
+			return True
+
+	return False
+
+
+
+def SelectPDBLines(pdb_lines, selection=Selection()):
+	"""
+	====================================================================================
+	Filters the lines of a PDB file down to the backbone atom records needed to 
+	calculate dihedral angles for the selected models, chains and residues. Yields 
+	(model number, lines) for each selected model, one model at a time, so only the 
+	selected atoms of one model are held in memory. Stops reading once past the last 
+	selected model. 
+
+	Residue ranges are widened by one residue either side, so the angles of residues 
+	at the ends of a range can be calculated. 
+	====================================================================================
+	"""
+
+	models = selection.models
+	chains = selection.chains
+	residues = selection.residues
+
+	last_model = max(last for first, last in models) if models else None
+
+	if residues:
+		residues = tuple((first - 1, last + 1) for first, last in residues)
+
+	model_number = -1
+	model_selected = False
+	model_lines = []
+
+	for line in pdb_lines:
+		record = line[:6]
+
+		if record == "MODEL ":
+			if model_lines:
+				yield model_number, model_lines
+				model_lines = []
+
+			model_number += 1
+
+			if last_model is not None and model_number > last_model:
+				return
+
+			model_selected = models is None or InRanges(model_number, models)
+
+		elif record == "ATOM  " or record == "HETATM":
+
+			# Files without MODEL records hold a single model
+			if model_number == -1:
+				model_number = 0
+				model_selected = models is None or InRanges(0, models)
+
+			if not model_selected:
+				continue
+
+			# Slices, so truncated records are skipped here and reported by the parser
+			if chains is not None and line[21:22] not in chains:
+				continue
+
+			if line[12:16].strip() not in BACKBONE_ATOMS:
+				continue
+
+			if residues is not None:
 				try:
-					model = Bio.PDB.PDBParser().get_structure(pdb_code, pdb_file_name)[model_number]
-					model_dihedrals = ModelDihedrals(model, model_number)
-					pdb_summaryDF = pd.concat([pdb_summaryDF, model_dihedrals], ignore_index=True)
-				# Invalid model number given 
-				except:
-					inv_model = True
-					print("\n  ERROR: Invalid model number entered \n")
-					exit()
-
-			# Append PDB code information to final DataFrame
-			pdb_list = [pdb_code] * len(pdb_summaryDF)
-			pdb_summaryDF.insert(loc=0, column="PDBCode", value=pdb_list)
-
-			return pdb_summaryDF
-
-		# Invalid PDB file name given
-		except:
-			if not inv_model:
-				print("\n  ERROR: Invalid PDB file \n " )
-				exit()
-			else:
-				exit()
+					residue_number = int(line[22:26])
+				except ValueError as error:
+					raise PDBFileError(str("Invalid residue number: " 
+													+ line[22:26].strip())) from error
 
-	# No file name given
+				if not InRanges(residue_number, residues):
+					continue
+
+			model_lines.append(line)
+
+		elif record == "ENDMDL" and model_lines:
+			yield model_number, model_lines
+			model_lines = []
+
+	if model_lines:
+		yield model_number, model_lines
+
+
+
+def ParseModels(pdb_lines, pdb_code, selection=Selection()):
+	"""
+	====================================================================================
+	Parses the selected models of a PDB file (given as an iterable of lines) into 
+	Biopython model objects, yielding (model number, model) one model at a time. 
+
+	Raises ModelNumberError or ChainIDError if nothing matches the selection, and 
+	PDBFileError if the file holds no atoms at all. 
+	====================================================================================
+	"""
+
+	parser = Bio.PDB.PDBParser()
+	n_models = 0
+
+	for model_number, model_lines in SelectPDBLines(pdb_lines, selection):
+
+		try:
+			structure = parser.get_structure(pdb_code, io.StringIO("".join(model_lines)))
+		except (ValueError, IndexError, 
+						Bio.PDB.PDBExceptions.PDBConstructionException) as error:
+			raise PDBFileError(str("Invalid PDB file: " + str(pdb_code))) from error
+
+		n_models += 1
+		yield model_number, structure[0]
+
+	if n_models == 0:
+		raise MakeNoModelsError(pdb_code, selection)
+
+
+
+def MakeNoModelsError(pdb_code, selection=Selection()):
+	"""
+	====================================================================================
+	Makes the error to raise when no models of a PDB file match the selection: 
+	ModelNumberError, ChainIDError, or PDBFileError if nothing was selected. 
+	====================================================================================
+	"""
+
+	if selection.models is not None:
+		model_numbers = [str(first) if first == last else str(first) + "-" + str(last) 
+											for first, last in selection.models]
+		return ModelNumberError(str("Invalid model number: " + ",".join(model_numbers)))
+	elif selection.chains is not None or selection.residues is not None:
+		return ChainIDError(str("No residues match selection in: " + str(pdb_code)))
 	else:
-		print("\n ERROR: No PDB file specified \n")
-		print(" Specify PDB file using: \n \n     --PDB /path_to_file/<filename.pdb> \n \n")
-		exit()
\ No newline at end of file
+		return PDBFileError(str("No models found in PDB file: " + str(pdb_code)))
+
+
+
+def ModelsDihedrals(models, pdb_code, selection=Selection()):
+	"""
+	====================================================================================
+	Generates a Pandas DataFrame of phi/psi angles (and other information) from 
+	(model number, model) pairs, as yielded by ParseModels(). Residues read only to 
+	calculate the angles at the ends of a selected residue range are removed. 
+	====================================================================================
+	"""
+
+	pdb_summaryDF = pd.DataFrame(columns=["ModelID","chainID","residueName",
+											"residueIndex","phi","psi","type"])
+
+	for model_number, model in models:
+		model_dihedrals = ModelDihedrals(model, model_number)
+		pdb_summaryDF = pd.concat([pdb_summaryDF, model_dihedrals], ignore_index=True)
+
+	if selection.residues is not None:
+		in_range = [InRanges(int(index), selection.residues) 
+											for index in pdb_summaryDF["residueIndex"]]
+		pdb_summaryDF = pdb_summaryDF.loc[in_range].reset_index(drop=True)
+
+	# Append PDB code information to final DataFrame
+	pdb_list = [pdb_code] * len(pdb_summaryDF)
+	pdb_summaryDF.insert(loc=0, column="PDBCode", value=pdb_list)
+
+	return pdb_summaryDF
+
+
+
+def CombineSelection(selection=None, iter_models=True, model_number=0, 
+													iter_chains=True, chain_id=None):
+	"""
+	====================================================================================
+	Merges the model number and chain ID arguments of ExtractDihedrals() (and the 
+	--models/--chains command line arguments) into a Selection. They replace the 
+	corresponding fields of the given selection. chain_id may be a chain ID, a comma 
+	separated string of chain IDs or a list of them. 
+	====================================================================================
+	"""
+
+	if selection is None:
+		selection = Selection()
+	elif isinstance(selection, str):
+		selection = ParseSelection(selection)
+
+	if not iter_models:
+		selection = Selection(((model_number, model_number),), selection.chains, 
+															selection.residues)
+
+	if not iter_chains:
+		if isinstance(chain_id, str):
+			chain_id = chain_id.split(",")
+		chains = frozenset(str(chain).strip() for chain in chain_id)
+		selection = Selection(selection.models, chains, selection.residues)
+
+	return selection
+
+
+
+def ReadPDBLines(pdb_file_name):
+	"""
+	====================================================================================
+	Yields the lines of a PDB file, decompressing it on the fly if gzipped. 
+	====================================================================================
+	"""
+
+	try:
+		with open(pdb_file_name, "rb") as pdb_file:
+			is_gzip = pdb_file.read(2) == b"\x1f\x8b"
+
+		if is_gzip:
+			pdb_file = gzip.open(pdb_file_name, "rt", errors="replace")
+		else:
+			pdb_file = open(pdb_file_name, "r", errors="replace")
+
+		with pdb_file:
+			yield from pdb_file
+
+	# Truncated or corrupt gzip files raise EOFError or zlib.error while being read
+	except (OSError, EOFError, zlib.error) as error:
+		raise PDBFileError(str("Invalid PDB file: " + str(pdb_file_name))) from error
+
+
+
+def ExtractDihedrals(pdb_file_name=None, iter_models=True, model_number=0, 
+										iter_chains=True, chain_id=None, selection=None):
+	"""
+	====================================================================================
+	Generates a Pandas DataFrame of phi/psi angles (and other information) from a given 
+	PDB file, which may be gzipped. 
+
+	selection can be a Selection or a selection string (see ParseSelection()), merged 
+	with the model and chain arguments by CombineSelection(). Only the selected backbone 
+	atoms are parsed. 
+
+	Raises PDBFileError if no file is given or it cannot be parsed, ModelNumberError if 
+	the requested model is not in the file, ChainIDError if no residues match the 
+	requested chains/residues and SelectionError if the selection cannot be read. 
+	====================================================================================
+	"""
+
+	# No file name given
+	if pdb_file_name is None:
+		raise PDBFileError(str("No PDB file specified. Specify PDB file using: "
+											"--pdb /path_to_file/<filename.pdb>"))
+
+	pdb_code = PDBCode(pdb_file_name)
+
+	selection = CombineSelection(selection, iter_models, model_number, iter_chains, 
+																			chain_id)
+
+	models = ParseModels(ReadPDBLines(pdb_file_name), pdb_code, selection)
+
+	return ModelsDihedrals(models, pdb_code, selection)
@@ -0,0 +1,402 @@
+"""
+	====================================================================================
+	Animated Ramachandran plots of NMR ensembles and MD trajectories (multi-model PDB
+	files), with one frame per model.
+
+	The static layers of the plot (background, contour lines, grid and axes) are drawn
+	once. Each frame restores that cached image and only draws the moving points on top
+	(blitting), rather than re-rendering the whole figure. Raw frames are piped straight
+	into an ffmpeg encoder as they are made, so memory does not grow with the number of
+	frames. Only the selected backbone atoms of each model are read here. Parsing models,
+	calculating their dihedral angles and rendering frames (by far the slowest steps) can
+	be done in parallel by worker processes, in chunks which are written to the encoder
+	in order.
+
+	Usage:
+		python EnsembleAnimator.py trajectory.pdb --out trajectory.mp4 --workers 4
+
+	The output format follows the file extension (e.g. .mp4, .webm or .gif). Requires
+	ffmpeg (set matplotlib's animation.ffmpeg_path rcParam if it is not on the PATH).
+
+	Author information:
+	 - Joseph I. J. Ellaway
+	 - josephellaway@gmail.com
+	 - https://github.com/Joseph-Ellaway
+	====================================================================================
+"""
+
+import argparse
+import itertools
+import subprocess
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import numpy as np
+import pandas as pd
+
+from DihedralCalculator import (MakeNoModelsError, ModelsDihedrals, ParseModels, ParseSelection,
+					PDBCode, RamachandranError, ReadPDBLines, Selection, SelectPDBLines)
+from RamaArgumentParser import VerboseStatement
+from RamachandranPlotter import BuildRamachandranFigure
+from ReferenceLibrary import PLOT_TYPES, LoadReferenceData, SharedReferenceData
+
+
+# Animation figure of the current worker process, made by InitialiseAnimation()
+_ANIMATION = None
+
+
+
+def EnsembleModels(pdb_files, selection=Selection()):
+	"""
+	====================================================================================
+	Reads the selected models of the given PDB files (in order), one model at a time.
+	Yields a frame for each: (PDB code, model number, backbone atom lines). Raises the
+	error made by MakeNoModelsError() if nothing in a file matches the selection.
+	====================================================================================
+	"""
+
+	for pdb_file in pdb_files:
+		pdb_code = PDBCode(pdb_file)
+		n_models = 0
+
+		for model_number, model_lines in SelectPDBLines(ReadPDBLines(pdb_file), selection):
+			n_models += 1
+			yield pdb_code, model_number, model_lines
+
+		if n_models == 0:
+			raise MakeNoModelsError(pdb_code, selection)
+
+
+
+def ChunkFrames(frames, chunk_size):
+	"""
+	============================================================================
+	Groups an iterable of frames into lists of up to chunk_size frames.
+	============================================================================
+	"""
+
+	chunk = []
+
+	for frame in frames:
+		chunk.append(frame)
+
+		if len(chunk) == chunk_size:
+			yield chunk
+			chunk = []
+
+	if chunk:
+		yield chunk
+
+
+
+def FrameAngles(pdb_code, model_number, model_lines):
+	"""
+	====================================================================================
+	Parses a model's backbone atom lines and returns its phi/psi pairs (of residues of
+	the animation's plot type) as an array.
+	====================================================================================
+	"""
+
+	models = [(model_number, model) for _, model in ParseModels(model_lines, pdb_code)]
+	model_df = ModelsDihedrals(models, pdb_code, _ANIMATION["selection"]).dropna()
+
+	if _ANIMATION["plot_type"] != "All":
+		model_df = model_df.loc[model_df["type"] == _ANIMATION["plot_type"]]
+
+	return model_df[["phi", "psi"]].to_numpy(dtype=np.float32)
+
+
+
+def InitialiseAnimation(reference, plot_type, selection, out_resolution, plot_kwargs):
+	"""
+	====================================================================================
+	Builds the animation figure for this process and caches an image of its static
+	layers. reference is a ReferenceData, or the path of a shared reference file (see
+	ReferenceLibrary.py) to attach to. Used as the initialiser of worker processes.
+	====================================================================================
+	"""
+
+	global _ANIMATION
+
+	if isinstance(reference, str):
+		reference = SharedReferenceData(reference, plot_type)
+
+	empty_df = pd.DataFrame({"phi" : [], "psi" : []})
+
+	fig, ax, points = BuildRamachandranFigure(empty_df, reference, **plot_kwargs)
+
+	label = ax.text(0.03, 0.97, "", transform=ax.transAxes, ha="left", va="top",
+							fontsize=10, zorder=5)
+
+	# Animated artists are left out of full draws, so the cached image is static layers only
+	points.set_animated(True)
+	label.set_animated(True)
+
+	fig.set_dpi(out_resolution)
+	fig.canvas.draw()
+
+	_ANIMATION = {
+		"fig" : fig,
+		"ax" : ax,
+		"points" : points,
+		"label" : label,
+		"background" : fig.canvas.copy_from_bbox(fig.bbox),
+		"plot_type" : plot_type,
+		"selection" : selection
+		}
+
+	return fig.canvas.get_width_height()
+
+
+
+def RenderFrame(frame):
+	"""
+	====================================================================================
+	Calculates the dihedral angles of a frame (as yielded by EnsembleModels()), then
+	renders it by restoring the cached static layers and drawing the points and label
+	on top. Returns the raw RGBA pixels as bytes.
+	====================================================================================
+	"""
+
+	pdb_code, model_number, model_lines = frame
+	angles = FrameAngles(pdb_code, model_number, model_lines)
+
+	canvas = _ANIMATION["fig"].canvas
+
+	canvas.restore_region(_ANIMATION["background"])
+
+	_ANIMATION["points"].set_offsets(angles.reshape(-1, 2))
+	_ANIMATION["label"].set_text(str(pdb_code + "  model " + str(model_number)))
+
+	_ANIMATION["ax"].draw_artist(_ANIMATION["points"])
+	_ANIMATION["ax"].draw_artist(_ANIMATION["label"])
+
+	return bytes(canvas.buffer_rgba())
+
+
+
+def RenderChunk(frames):
+	"""
+	============================================================================
+	Renders a chunk of frames, returning their raw RGBA pixels joined together.
+	============================================================================
+	"""
+
+	return b"".join(RenderFrame(frame) for frame in frames)
+
+
+
+def OpenEncoder(out_file_name, width, height, fps):
+	"""
+	====================================================================================
+	Starts an ffmpeg process which encodes raw RGBA frames written to its stdin. GIFs
+	use a palette per frame so they can be encoded as a stream, other formats use
+	yuv420p (padded to even dimensions) for compatibility with common players.
+	====================================================================================
+	"""
+
+	command = [matplotlib.rcParams["animation.ffmpeg_path"], "-y", "-loglevel", "error",
+				"-f", "rawvideo", "-pix_fmt", "rgba", "-s", str(width) + "x" + str(height),
+				"-r", str(fps), "-i", "-"]
+
+	if out_file_name.lower().endswith(".gif"):
+		command += ["-vf",
+				"split[a][b];[a]palettegen=stats_mode=single[p];[b][p]paletteuse=new=1"]
+	else:
+		command += ["-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-pix_fmt", "yuv420p"]
+
+	command.append(out_file_name)
+
+	try:
+		return subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+	except OSError as error:
+		raise RamachandranError(str("Could not start ffmpeg (" + command[0] + "). "
+					"Install ffmpeg or set matplotlib's animation.ffmpeg_path.")) from error
+
+
+
+def CloseEncoder(encoder, out_file_name):
+	"""
+	====================================================================================
+	Finishes encoding, raising RamachandranError if ffmpeg failed.
+	====================================================================================
+	"""
+
+	try:
+		encoder.stdin.close()
+	except BrokenPipeError:
+		pass
+
+	error_output = encoder.stderr.read().decode("utf-8", errors="replace").strip()
+
+	if encoder.wait() != 0:
+		raise RamachandranError(str("ffmpeg could not write " + out_file_name + ": "
+																	+ error_output))
+
+
+
+def AnimateEnsemble(pdb_files, out_file_name, plot_type=0, selection=None, fps=10,
+					workers=1, chunk_size=32, out_resolution=96, background_colour="Blues",
+					reference=None, shared_reference=None, verb=False, **plot_kwargs):
+	"""
+	====================================================================================
+	Writes an animated Ramachandran plot with one frame per selected model of the given
+	PDB files. Models are read lazily, so memory stays bounded however long the
+	animation is. With more than one worker, chunks of chunk_size frames are calculated
+	and rendered in parallel by worker processes, with at most two chunks per worker in
+	flight at a time. reference can be given as a ReferenceData, otherwise
+	shared_reference (a file published by ReferenceLibrary.py) is attached to, or the
+	reference is built here. plot_kwargs are passed to BuildRamachandranFigure().
+
+	Returns the number of frames written.
+	====================================================================================
+	"""
+
+	plot_type = PLOT_TYPES[int(plot_type)]
+
+	if selection is None:
+		selection = Selection()
+	elif isinstance(selection, str):
+		selection = ParseSelection(selection)
+
+	if shared_reference:
+		reference = shared_reference
+	elif reference is None:
+		VerboseStatement(verb, "Importing Top8000 library")
+		reference = LoadReferenceData(plot_type, background_colour)
+
+	chunks = ChunkFrames(EnsembleModels(pdb_files, selection), chunk_size)
+
+	# Read the first chunk before starting the encoder, so selection errors leave no file
+	first_chunk = next(chunks, None)
+
+	if first_chunk is None:
+		raise RamachandranError("No PDB files to animate")
+
+	# Frame size is needed to start the encoder, so the figure is always built here too
+	width, height = InitialiseAnimation(reference, plot_type, selection, out_resolution,
+																		plot_kwargs)
+
+	encoder = OpenEncoder(out_file_name, width, height, fps)
+
+	VerboseStatement(verb, "Calculating dihedral angles and rendering frames")
+
+	n_frames = 0
+
+	def WriteChunk(chunk_bytes):
+		nonlocal n_frames
+		encoder.stdin.write(chunk_bytes)
+		n_frames += len(chunk_bytes) // (width * height * 4)
+		VerboseStatement(verb, str("  " + str(n_frames) + " frames"))
+
+	try:
+		if workers <= 1:
+			for chunk in itertools.chain([first_chunk], chunks):
+				WriteChunk(RenderChunk(chunk))
+
+		else:
+			with ProcessPoolExecutor(max_workers=workers, initializer=InitialiseAnimation,
+						initargs=(reference, plot_type, selection, out_resolution, 
+														plot_kwargs)) as pool:
+
+				pending = deque()
+				remaining = itertools.chain([first_chunk], chunks)
+
+				for chunk in remaining:
+					pending.append(pool.submit(RenderChunk, chunk))
+
+					if len(pending) >= 2 * workers:
+						break
+
+				# Write chunks in order, submitting a new one as each is written
+				while pending:
+					WriteChunk(pending.popleft().result())
+
+					next_chunk = next(remaining, None)
+
+					if next_chunk is not None:
+						pending.append(pool.submit(RenderChunk, next_chunk))
+
+	except BrokenPipeError:
+		pass			# ffmpeg exited early, its error is reported by CloseEncoder()
+
+	except BaseException:
+		encoder.kill()
+		encoder.wait()
+		raise
+
+	CloseEncoder(encoder, out_file_name)
+
+	return n_frames
+
+
+
+def CollectAnimationArgs():
+	"""
+	====================================================================================
+	Collects the animator's input arguments from the command line.
+	====================================================================================
+	"""
+
+	parser = argparse.ArgumentParser()
+
+	parser.add_argument("pdb_files", nargs="+",
+						help="Multi-model PDB files (may be gzipped). Frames follow file and model order.")
+
+	parser.add_argument("-o", "--out",
+						help="Animation file to write. Format follows the extension, e.g. .mp4 or .gif",
+						type=str, required=True)
+
+	parser.add_argument("-v", "--verbose", help="Increase output verbosity",
+						action="store_true")
+
+	parser.add_argument("-t", "--plot_type",
+						help="Type of angles plotted on Ramachandran diagram. Refer to README.md for options and details.",
+						type=int, default=0, choices=range(len(PLOT_TYPES)))
+
+	parser.add_argument("--select",
+						help="Models, chains and residues to animate, e.g. \"model 0-99 and chain A\". Refer to README.md for details.",
+						type=str)
+
+	parser.add_argument("--fps", help="Frames per second (default: 10).",
+						type=int, default=10)
+
+	parser.add_argument("--workers", help="Frame rendering processes (default: 1).",
+						type=int, default=1)
+
+	parser.add_argument("--chunk_size",
+						help="Frames rendered per task by a worker (default: 32).",
+						type=int, default=32)
+
+	parser.add_argument("--resolution", help="Frame resolution in dpi (default: 96).",
+						type=int, default=96)
+
+	parser.add_argument("--shared_reference",
+						help="Reference data file published by ReferenceLibrary.py.",
+						type=str)
+
+	return parser.parse_args()
+
+
+
+if __name__ == "__main__":
+
+	args = CollectAnimationArgs()
+
+	start_time = time.time()
+
+	try:
+		n_frames = AnimateEnsemble(args.pdb_files, args.out, plot_type=args.plot_type,
+								selection=args.select, fps=args.fps, workers=args.workers,
+								chunk_size=args.chunk_size, out_resolution=args.resolution,
+								shared_reference=args.shared_reference, verb=args.verbose)
+	except RamachandranError as error:
+		print("\n  ERROR:", error, "\n")
+		sys.exit(1)
+
+	print(str("Done. \n " + str(n_frames) + " frames in "
+				+ str(round(time.time() - start_time, 1)) + " s. Animation saved to "
+				+ args.out))
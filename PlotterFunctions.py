@@ -21,12 +21,15 @@
 """
 
 
-from scipy import ndimage
-import cv2
+import io
 import os
-import matplotlib.pyplot as plt
+
+import cv2
+import numpy as np
 from matplotlib import colors
-from matplotlib.colors import LogNorm
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from scipy import ndimage
 
 
 # Removes qt5ct messages. Comment out to debug
@@ -34,6 +37,13 @@ os.environ["QT_LOGGING_RULES"]="qt5ct.debug=false"
 
 # Change to suit taste
 
+# Reference histogram counts at the inner and outer contour lines. Angles are scored 
+# against the same levels (Favoured inside the inner line, Allowed inside the outer).
+CONTOUR_LEVEL_INNER = 96
+CONTOUR_LEVEL_OUTER = 15
+
+
+
 def AxesRemover(mpl_axis):
 	"""
 	=========================================================
@@ -41,21 +51,51 @@ def AxesRemover(mpl_axis):
 	=========================================================
 	"""
 	mpl_axis.set_frame_on(False)
-	mpl_axis.get_xmpl_axis().tick_bottom()
-	mpl_axis.get_ympl_axis().set_visible(False)
-	mpl_axis.get_xmpl_axis().set_visible(False)
+	mpl_axis.get_xaxis().tick_bottom()
+	mpl_axis.get_yaxis().set_visible(False)
+	mpl_axis.get_xaxis().set_visible(False)
+
+
+
+def NewFigure(figsize):
+	"""
+	====================================================================================
+	Creates a Matplotlib Figure with a single Axes, attached to its own Agg canvas. 
+	Figures made here are independent of pyplot's global state, so can be drawn in 
+	separate threads.
+	====================================================================================
+	"""
+	fig = Figure(figsize=figsize, tight_layout=True)
+	FigureCanvasAgg(fig)
+	ax = fig.add_subplot(1, 1, 1)
+	return fig, ax
+
+
+
+def FigureToArray(fig, resolution):							# dtypes : Figure, int 
+	"""
+	====================================================================================
+	Renders a figure at a given resolution and returns its pixels as an RGBA uint8 
+	array. 
+	====================================================================================
+	"""
+	fig.set_dpi(resolution)
+	fig.canvas.draw()
+	return np.asarray(fig.canvas.buffer_rgba()).copy()
 
 
 
-def SaveAndCloseFigure(out_file_name, resolution):			# dtypes : string, int 
+def FigureToBytes(fig, file_type, resolution):				# dtypes : Figure, string, int 
 	"""
 	====================================================================================
-	Saves the plot area (defined before function called) as a PNG image to given file 
-	name and resolution. 
+	Saves a figure in the given file type (PNG, PDF, SVG, EPS or PS) and resolution, 
+	returning the encoded file contents as bytes. 
 	====================================================================================
 	"""
-	plt.savefig(out_file_name, dpi=resolution, bbox_inches=0, pad_inches=None)
-	plt.close()
+	buffer = io.BytesIO()
+	fig.savefig(buffer, format=file_type, dpi=resolution, bbox_inches=0, pad_inches=None)
+	return buffer.getvalue()
+
 
 
 def SelectAngles(df, plot_type):
@@ -70,14 +110,14 @@ def SelectAngles(df, plot_type):
 
 
 
-def PhiPsiPlotter(phi_angles, psi_angles, figsize, file_name, background_colour):	# dtypes : array-like, 
+def PhiPsiPlotter(phi_angles, psi_angles, figsize, background_colour):	# dtypes : array-like, 
 	"""
 	====================================================================================
 	Creates a 2D histogram (Ramachandran plot) of out of phi and psi angles from the 
-	Top8000 peptide DB.
+	Top8000 peptide DB. Returns the rendered histogram as a greyscale image array.
 	====================================================================================
 	"""
-	fig, ax = plt.subplots(1,1, figsize=figsize, tight_layout=True)
+	fig, ax = NewFigure(figsize)
 	fig.patch.set_visible(False)
 	kwargs = {
 		"bins" : 140, 
@@ -87,64 +127,67 @@ def PhiPsiPlotter(phi_angles, psi_angles, figsize, file_name, background_colour)
 	# Reference https://matplotlib.org/3.2.1/gallery/statistics/hist.html for help with making 2D histogram.
 	ax.set_axis_off()
 	ax.hist2d(phi_angles, psi_angles, **kwargs)
-	SaveAndCloseFigure(file_name, 80)
+	return cv2.cvtColor(FigureToArray(fig, 80), cv2.COLOR_RGBA2GRAY)
 
 
 
 
-def Smoother(file_name, figsize, background_colour):
+def Smoother(rama_plot, figsize, background_colour):
 	"""
 	====================================================================================
-	Reads a given pixelated image (passed into function as the file name as a string) 
-	and "smoothes" it out to create an unpixelated version.
-	The unpixelated ("smoothed") version is then saved to ~/your_current_dir, 
-	overwriting the pixelated input image. 
+	Takes a pixelated greyscale image array and "smoothes" it out to create an 
+	unpixelated version, which is returned as an RGBA image array. 
 	====================================================================================
 	"""
-	fig, ax = plt.subplots(1,1, figsize=figsize, tight_layout=True)
+	fig, ax = NewFigure(figsize)
 	fig.patch.set_visible(False)
 	kwargs = {
 		"cmap" : str(background_colour + "_r"), 
 		"alpha" : 1}
 	ax.set_axis_off()
-	rama_plot = cv2.imread(file_name, 0)
 	blurred_rama_plot = ndimage.gaussian_filter(rama_plot, sigma=0.3)
 	smoothed_rama_plot = ndimage.percentile_filter(blurred_rama_plot, percentile=90, size=20)
 	ax.imshow(smoothed_rama_plot, **kwargs)
 	bkgd_resolution = 96									# Adjust integer to change background resolution (higher = better quality but slower run time)
-	SaveAndCloseFigure(file_name, bkgd_resolution)
-	plt.close()
+	return FigureToArray(fig, bkgd_resolution)
 
 
 
-def MakeBackground(dihedral_df, plot_type, file_name, background_colour):
+def MakeBackground(dihedral_df, background_colour):
 	"""
 	====================================================================================
-	Reads a given pixelated image (passed into function as the file name as a string) 
-	and "smoothes" it out to create an unpixelated version.
-	The unpixelated ("smoothed") version is then saved to ~/your_current_dir, 
-	overwriting the pixelated input image. 
+	Plots a pixelated 2D histogram of phi/psi angles then "smoothes" it out, returning 
+	the unpixelated background of favoured regions as an RGBA image array. 
 	====================================================================================
 	"""
 	# Uses Top8000 DB
 	figure_size_background=(10,10)					# Does not change output image size. 
 
-	file_name = str(file_name + ".png")
-	PhiPsiPlotter(dihedral_df["phi"], dihedral_df["psi"], figure_size_background, 
-														file_name, background_colour)
-	Smoother(file_name, figure_size_background, background_colour)
+	rama_plot = PhiPsiPlotter(dihedral_df["phi"], dihedral_df["psi"], 
+										figure_size_background, background_colour)
+	return Smoother(rama_plot, figure_size_background, background_colour)
 
 
 
-def AddContour(axis, df, contour_level, line_colour, contour_alpha=1):
+def ContourCounts(df):
 	"""
-	===============================================================
-	Appends contour lines to a given axis based on phi/psi angles. 
-	===============================================================
+	====================================================================================
+	Bins phi/psi angles into the 2D histogram used to draw contour lines. Returns the 
+	counts along with the phi and psi bin edges. 
+	====================================================================================
 	"""
+	counts, phi_edges, psi_edges = np.histogram2d(df["phi"], df["psi"], bins=90)
+	return counts, phi_edges, psi_edges
+
 
-	counts, discard1, discard2, discard3 = plt.hist2d(df["phi"],df["psi"], bins=90, 
-																norm=LogNorm(), alpha=0)
+
+def AddContour(axis, counts, contour_level, line_colour, contour_alpha=1):
+	"""
+	====================================================================================
+	Appends contour lines to a given axis from a 2D histogram of phi/psi angles (as 
+	returned by ContourCounts). 
+	====================================================================================
+	"""
 
 	axis.contour(counts.transpose(), extent=[-180, 180, -180, 180], 
 							levels=[contour_level], linewidths=1, colors=[line_colour], 
@@ -152,6 +195,36 @@ def AddContour(axis, df, contour_level, line_colour, contour_alpha=1):
 
 
 
+def ScoreAngles(phi_angles, psi_angles, counts, phi_edges, psi_edges, 
+											contour_level_inner, contour_level_outer):
+	"""
+	====================================================================================
+	Scores phi/psi angle pairs against a 2D histogram of reference angles (as returned 
+	by ContourCounts). Returns two arrays: the reference density at each angle pair and 
+	its region, matching the contour lines drawn on the plot:
+		- Favoured (density within the inner contour line)
+		- Allowed (density within the outer contour line)
+		- Outlier
+	Angles outside the histogram's edges have no reference angles nearby, so score a 
+	density of 0. 
+	====================================================================================
+	"""
+	phi_bins = np.clip(np.searchsorted(phi_edges, phi_angles, side="right") - 1, 
+															0, counts.shape[0] - 1)
+	psi_bins = np.clip(np.searchsorted(psi_edges, psi_angles, side="right") - 1, 
+															0, counts.shape[1] - 1)
+
+	# The last bin includes its upper edge, as in np.histogram2d
+	in_range = ((phi_angles >= phi_edges[0]) & (phi_angles <= phi_edges[-1]) 
+						& (psi_angles >= psi_edges[0]) & (psi_angles <= psi_edges[-1]))
+
+	density = np.where(in_range, counts[phi_bins, psi_bins], 0)
+	regions = np.where(density >= contour_level_inner, "Favoured", 
+						np.where(density >= contour_level_outer, "Allowed", "Outlier"))
+	return density, regions
+
+
+
 def AddGridLines(axis):
 	"""
 	==============================
@@ -45,8 +45,16 @@ def CollctUserArgs():
 						type=int)
 
 	parser.add_argument("-c", "--chains", 
-						help="Desired chain number (default: all chains). Chain number corresponds to order in PDB file.",
-						type=int)
+						help="Desired chain ID(s), comma separated (default: all chains). E.g. A or A,B",
+						type=str)
+
+	parser.add_argument("-r", "--residues", 
+						help="Desired residue numbers or ranges, comma separated (default: all residues). E.g. 10-50,60",
+						type=str)
+
+	parser.add_argument("--select", 
+						help="Selection of models, chains and residues, e.g. \"model 0-4 and chain A,B and resi 10-50\". Refer to README.md for details.",
+						type=str)
 
 	parser.add_argument("-d", "--out_dir", 
 						help="Out directory. Must be available before-hand.",
@@ -64,10 +72,14 @@ def CollctUserArgs():
 						help="Save calculated dihedral angles in separate CSV.",
 	                    action="store_true")
 
+	parser.add_argument("--shared_reference", 
+						help="Reference data file published by ReferenceLibrary.py, shared between processes.",
+						type=str)
+
 	args = parser.parse_args()
 
 	# Analysing arguments 
-	if not args.models:			# Iterate models?
+	if args.models is None:		# Iterate models?
 		model_num = 0
 		itmod = True
 	elif isinstance(args.models, int):
@@ -77,13 +89,19 @@ def CollctUserArgs():
 		print("Invalid model number. ")
 
 	if not args.chains:			# Iterate chains?
-		chain_num = 0
+		chain_num = None
 		itchain = True
-	elif isinstance(args.chains, int):
+	else:
 		chain_num = args.chains
 		itchain = False
-	else:
-		print("Invalid chain number.")
+
+	selection = args.select		# Models, chains and residues to read (combined later)
+
+	if args.residues:
+		if selection:
+			selection = str(selection + " and resi " + args.residues)
+		else:
+			selection = str("resi " + args.residues)
 
 	if not args.out_dir:		# Handling the out directory
 		out_dir = "./"
@@ -114,7 +132,7 @@ def CollctUserArgs():
 		# convert file type to lower case
 		file_type = args.file_type.lower()
 
-	return args.pdb, itmod, model_num, itchain, chain_num, plot_type, out_dir, args.verbose, args.save_csv, file_type
+	return args.pdb, itmod, model_num, itchain, chain_num, plot_type, out_dir, args.verbose, args.save_csv, file_type, selection, args.shared_reference
 
 
 
@@ -25,9 +25,12 @@
 	====================================================================================
 """
 
-import os
+import sys
+import threading
+from dataclasses import dataclass
 
-import matplotlib.pyplot as plt
+import matplotlib
+import matplotlib.style
 # Base functions
 import pandas as pd
 
@@ -35,130 +38,284 @@ import pandas as pd
 from DihedralCalculator import *
 from PlotterFunctions import *
 from RamaArgumentParser import *
+from ReferenceLibrary import *
 
+# Matplotlib style of the final plot
+PLOT_STYLE = "seaborn-v0_8-poster"
 
-# Main function
-def main(pdb, itmod, model_num, itchain, chain_num, plot_type, out_dir, verb, save, file_type):
+# Output file types (--file_type)
+FILE_TYPES = ["png", "pdf", "svg", "eps", "ps"]
 
-	########################################################
-	#				IMPORTING USER DATA					   #
+# Matplotlib styles are applied through the global rcParams. Only one thread at a time 
+# may build a figure under the plot style.
+_STYLE_LOCK = threading.Lock()
 
-	VerboseStatement(verb, str("Importing " + str(pdb)) )
 
-	userpdb_df = ExtractDihedrals(pdb_file_name=pdb, iter_models=itmod, 
-					model_number=model_num, iter_chains=itchain, chain_id=chain_num)
-	# Remove invalid dihedral angles/angles from ligands or non-canonical residues
-	userpdb_df = userpdb_df.dropna()
 
-	# Selecting user's desired Ramachandran plot
-	options = ["All", "General", "Glycine", "Proline", "Pre-proline", "Ile-Val"] 
-									# Available plots
-	# User input determines background
-	plot_type = options[int(plot_type)]				
-	# Out file name
-	plot_name = str(out_dir + '/' + pdb[:-4] + '_' + plot_type + "RamachandranPlot_tmp")
+@dataclass(frozen=True)
+class RamachandranResult:
+	"""
+	====================================================================================
+	Output of RamachandranPlot():
+		- angles : DataFrame of the plotted dihedral angles, with each residue's 
+		           reference "density" and "region" (Favoured, Allowed or Outlier)
+		- scores : Number of residues in each region
+		- image : Rendered plot, encoded as file_type
+	====================================================================================
+	"""
+	plot_type: str
+	angles: pd.DataFrame
+	scores: dict
+	image: bytes
+	file_type: str
 
 
 
-	########################################################
-	#				IMPORTING REFERENCE DATA			   #
+def CheckFileType(file_type):
+	"""
+	====================================================================================
+	Raises RamachandranError if file_type is not one of FILE_TYPES. 
+	====================================================================================
+	"""
 
-	VerboseStatement(verb, "Importing Top8000 library")
+	if str(file_type).lower() not in FILE_TYPES:
+		raise RamachandranError(str("Invalid file type: " + str(file_type) + ". Options: " 
+															+ ", ".join(FILE_TYPES)))
 
-	# Top8000 peptide dataset. Pre-analysed
-	top8000_df = SelectAngles(pd.read_csv("Top8000_DihedralAngles.csv.gz", compression="gzip"), 
-								plot_type)
 
 
+def BuildRamachandranFigure(userpdb_df, reference, 
+						figure_size=(5,5), 
+						contour_level_inner=CONTOUR_LEVEL_INNER, 
+						contour_level_outer=CONTOUR_LEVEL_OUTER, 
+						contour_line_color_inner="#DFF8FB", 
+						contour_line_color_outer="#045E93", 
+						data_point_colour="#D4AB2D", 
+						data_point_edge_colour="#3c3c3c"):
+	"""
+	====================================================================================
+	Builds the Ramachandran plot figure: reference background, contour lines, grid 
+	lines and dihedral angles. Returns the figure, its axis and the scatter plot of the 
+	angles (whose points can be updated, e.g. for animation). Parameters are described 
+	in RenderRamachandran(). 
+	====================================================================================
+	"""
 
-	########################################################
-	#				SELECTING RESIDUE TYPE DATA			   #
+	with _STYLE_LOCK, matplotlib.style.context(PLOT_STYLE):
 
-	if plot_type == "All":
-		pass
+		fig, ax = NewFigure(figure_size)		# Defining plot area. 
 
-	else:
+		# ADDING COUNTOURS - Comment this section out to remove contour lines from plot area.
+		AddContour(ax, reference.contour_counts, contour_level=contour_level_inner, 
+											line_colour=contour_line_color_inner)
+		AddContour(ax, reference.contour_counts, contour_level=contour_level_outer, 
+								line_colour=contour_line_color_outer, contour_alpha=0.3)
+
+		# ADDING FAVOURED RAMACHANDRAN REGION IMAGE TO BACKGROUND 
+		ax.imshow(reference.background, extent=[-195, 195, -195, 195], zorder=1)
+
+		# ADDING GRIDLINES
+		AddGridLines(ax)
+
+		# PLOTTING USER'S DIHEDRAL ANGLE DATA
+		points = ax.scatter(userpdb_df["phi"], userpdb_df["psi"], s=15, 
+								color=data_point_colour, zorder=4, linewidths=0.5, 
+								edgecolor=data_point_edge_colour)
+
+		# AXES AESTHETICS/FEATURES
+		FormatAxis(ax)
+
+		# Ticks are created lazily when drawn, so fix their style while it is applied
+		for axis_name in ["x", "y"]:
+			ax.tick_params(axis=axis_name, 
+							labelsize=matplotlib.rcParams[axis_name + "tick.labelsize"], 
+							pad=matplotlib.rcParams[axis_name + "tick.major.pad"], 
+							width=matplotlib.rcParams[axis_name + "tick.major.width"])
+
+	return fig, ax, points
+
+
+
+def RenderRamachandran(userpdb_df, reference, file_type="png", 
+						figure_size=(5,5), 
+						contour_level_inner=CONTOUR_LEVEL_INNER, 
+						contour_level_outer=CONTOUR_LEVEL_OUTER, 
+						contour_line_color_inner="#DFF8FB", 
+						contour_line_color_outer="#045E93", 
+						out_resolution=96, 
+						data_point_colour="#D4AB2D", 
+						data_point_edge_colour="#3c3c3c"):
+	"""
+	====================================================================================
+	Plots dihedral angles on top of the reference background and contour lines, 
+	returning the encoded plot as bytes. 
+
+	Recommended adjustable parameters:
+		- figure_size : Output figure size in inches.
+		- contour_level_inner : Percentile of dihedral angles for inner contour lines 
+		  (e.g. contour_level=96 means the area bounded by the contour line represents 
+		  the range of angles in which 96% of all dihedral from the Top800 peptide DB 
+		  fall within).
+		- contour_level_outer : Percentile of dihedral angles for outer contour lines
+		- contour_line_color_inner : Inner contour line colour.
+		- contour_line_color_outer : Colour of outer contour lines
+		- out_resolution : Output figure resolution. Not required if saving file as PDF
+		- data_point_colour : Colour of data points for each Phi-Psi dihedral angle pair. 
+		- data_point_edge_colour : Colour of data point's border.
+	====================================================================================
+	"""
+
+	fig, ax, points = BuildRamachandranFigure(userpdb_df, reference, 
+								figure_size=figure_size, 
+								contour_level_inner=contour_level_inner, 
+								contour_level_outer=contour_level_outer, 
+								contour_line_color_inner=contour_line_color_inner, 
+								contour_line_color_outer=contour_line_color_outer, 
+								data_point_colour=data_point_colour, 
+								data_point_edge_colour=data_point_edge_colour)
+
+	return FigureToBytes(fig, file_type, out_resolution)
+
+
+
+def PlotDihedrals(userpdb_df, plot_type=0, file_type="png", background_colour="Blues", 
+						contour_level_inner=CONTOUR_LEVEL_INNER, 
+						contour_level_outer=CONTOUR_LEVEL_OUTER, 
+						reference=None, **plot_kwargs):
+	"""
+	====================================================================================
+	Scores and plots dihedral angles (as returned by ExtractDihedrals). 
+
+	plot_type is an index of PLOT_TYPES. reference can be given as a ReferenceData to 
+	reuse, otherwise it is loaded (and cached) with LoadReferenceData(). plot_kwargs 
+	are passed to RenderRamachandran(). 
+
+	Returns a RamachandranResult. 
+	====================================================================================
+	"""
+
+	try:
+		plot_type = PLOT_TYPES[int(plot_type)]
+	except (IndexError, ValueError, TypeError):
+		raise RamachandranError(str("Invalid plot type: " + str(plot_type)))
+
+	CheckFileType(file_type)
+
+	# Remove invalid dihedral angles/angles from ligands or non-canonical residues
+	userpdb_df = userpdb_df.dropna()
+
+	# Selecting user's desired residue type
+	if plot_type != "All":
 		userpdb_df = userpdb_df.loc[userpdb_df["type"] == plot_type]
 
+	if reference is None:
+		reference = LoadReferenceData(plot_type, background_colour)
 
+	density, regions = ScoreAngles(userpdb_df["phi"].to_numpy(dtype=float), 
+									userpdb_df["psi"].to_numpy(dtype=float), 
+									reference.contour_counts, reference.phi_edges, 
+									reference.psi_edges, 
+									contour_level_inner, contour_level_outer)
 
-	########################################################
-	#				SAVING USER DATA (optional)			   #
+	userpdb_df = userpdb_df.assign(density=density, region=regions)
+	scores = {region : int((regions == region).sum()) 
+									for region in ["Favoured", "Allowed", "Outlier"]}
 
-	if save:
-		csv_file_name = str(plot_name[:-4] + ".csv")
-		VerboseStatement(verb, str("Saving CSV as: " + csv_file_name))
-		userpdb_df.to_csv(csv_file_name, index=False)
+	image = RenderRamachandran(userpdb_df, reference, file_type=file_type, 
+						contour_level_inner=contour_level_inner, 
+						contour_level_outer=contour_level_outer, **plot_kwargs)
 
-	else:
-		pass
+	return RamachandranResult(plot_type=plot_type, angles=userpdb_df, scores=scores, 
+													image=image, file_type=file_type)
 
-	VerboseStatement(verb, "Dihedral angles calculated")
 
 
+def RamachandranPlot(pdb_file_name, itmod=True, model_num=0, itchain=True, chain_num=None, 
+							plot_type=0, file_type="png", selection=None, **plot_kwargs):
+	"""
+	====================================================================================
+	Calculates, scores and plots the dihedral angles of a PDB file without touching 
+	pyplot's global state or exiting, so it can be called from other programs and 
+	threads. selection is a Selection or selection string (see ParseSelection()). 
+	plot_kwargs are passed to PlotDihedrals(). 
 
-	########################################################
-	#					PLOTTING DATA					   #
+	Returns a RamachandranResult. Raises RamachandranError subclasses on invalid input. 
+	====================================================================================
+	"""
 
-	# Recommended adjustable parameters. 
-	figure_size = (5,5)						# Output figure size in inches.
-	contour_level_inner = 96				# Percentile of dihedral angles for inner contour lines (e.g. contour_level=96 means the area bounded by the contour line represents the range of angles in which 96% of all dihedral from the Top800 peptide DB fall within).
-	contour_level_outer = 15				# Percentile of dihedral angles for outer contour lines
-	contour_line_color_inner = "#DFF8FB"	# Inner contour line colour.
-	contour_line_color_outer = "#045E93"	# Colour of outer contour lines
-	out_resolution = 96						# Output figure resolution. Not required if saving file as PDF
-	data_point_colour = "#D4AB2D"			# Colour of data points for each Phi-Psi dihedral angle pair. 
-	data_point_edge_colour = "#3c3c3c"		# Colour of data point's border.
-	background_colour = "Blues"				# Colour map of background plot. Refer to https://matplotlib.org/stable/tutorials/colors/colormaps.html for colormap options
+	userpdb_df = ExtractDihedrals(pdb_file_name=pdb_file_name, iter_models=itmod, 
+					model_number=model_num, iter_chains=itchain, chain_id=chain_num, 
+					selection=selection)
 
-	# Plotting background
-	VerboseStatement(verb, "Generating background of favoured regions")
+	return PlotDihedrals(userpdb_df, plot_type=plot_type, file_type=file_type, 
+																	**plot_kwargs)
 
-	MakeBackground(top8000_df, plot_type, plot_name, background_colour) 	# Genertating background: region of favoured dihedral angles
 
-	# Plotting user's PDB dihedral angles
-	VerboseStatement(verb, "Plotting Ramachandran diagram")
 
-	plt.style.use("seaborn-v0_8-poster")
+def OutFileName(pdb, out_dir, plot_type):
+	"""
+	====================================================================================
+	Returns the out file name (without extension) for a PDB file's plot and CSV. 
+	====================================================================================
+	"""
 
-	fig, ax = plt.subplots(1,1, figsize=figure_size, tight_layout=True)		# Defining plot area. 
+	return str(out_dir + '/' + PDBCode(pdb) + '_' + plot_type + "RamachandranPlot")
 
-	# ADDING COUNTOURS - Comment this section out to remove contour lines from plot area.
-	AddContour(ax, top8000_df, contour_level=contour_level_inner, line_colour=contour_line_color_inner)
-	AddContour(ax, top8000_df, contour_level=contour_level_outer, line_colour=contour_line_color_outer, contour_alpha=0.3)
 
-	# ADDING FAVOURED RAMACHANDRAN REGION IMAGE TO BACKGROUND 
-	ax.imshow(plt.imread(str(plot_name + ".png")), extent=[-195, 195, -195, 195], zorder=1)
 
-	# ADDING GRIDLINES
-	AddGridLines(ax)
+def WriteResult(result, plot_name, save):
+	"""
+	====================================================================================
+	Writes a RamachandranResult's plot, and optionally its dihedral angles as CSV, to 
+	plot_name with the appropriate extensions. 
+	====================================================================================
+	"""
 
-	# PLOTTING USER'S DIHEDRAL ANGLE DATA
-	ax.scatter(userpdb_df["phi"], userpdb_df["psi"], s=15, color=data_point_colour, 
-							zorder=4, linewidths=0.5, edgecolor=data_point_edge_colour)
+	if save:
+		result.angles.to_csv(str(plot_name + ".csv"), index=False)
 
-	# AXES AESTHETICS/FEATURES
-	FormatAxis(ax)
+	with open(str(plot_name + '.' + result.file_type), "wb") as plot_file:
+		plot_file.write(result.image)
 
-	# SAVING RAMACHANDRAN PLOT AS PNG IMAGE
-	VerboseStatement(verb, "Saving plot")
 
-	if file_type == "png":
 
-		# ... as PNG
-		plt.savefig(str(plot_name[:-4] + ".png"), dpi=out_resolution, bbox_inches=0, pad_inches=None)
+# Main function
+def main(pdb, itmod, model_num, itchain, chain_num, plot_type, out_dir, verb, save, file_type, 
+											selection=None, shared_reference=None):
+
+	VerboseStatement(verb, str("Importing " + str(pdb)) )
 
+	# Reference data published by ReferenceLibrary.py, otherwise built here
+	if shared_reference:
+		VerboseStatement(verb, str("Attaching shared reference data: " + shared_reference))
+		reference = SharedReferenceData(shared_reference, PLOT_TYPES[int(plot_type)])
 	else:
-		# ... as PDF
-		plt.savefig(str(plot_name[:-4] + '.' + file_type), bbox_inches=0, pad_inches=None)
-	
-	os.remove(str(plot_name + '.png'))
+		reference = None
+
+	result = RamachandranPlot(pdb, itmod=itmod, model_num=model_num, itchain=itchain, 
+							chain_num=chain_num, plot_type=plot_type, file_type=file_type, 
+							selection=selection, reference=reference)
+
+	VerboseStatement(verb, "Dihedral angles calculated")
+
+	# Out file name
+	plot_name = OutFileName(pdb, out_dir, result.plot_type)
 
-	plt.close()
 
-	# plt.show()
 
-	print("Done. \n Ramachandran plot saved to", str(plot_name[:-4] + '.' + file_type))
+	########################################################
+	#				SAVING PLOT AND USER DATA			   #
+
+	if save:
+		VerboseStatement(verb, str("Saving CSV as: " + plot_name + ".csv"))
+
+	VerboseStatement(verb, "Saving plot")
+
+	WriteResult(result, plot_name, save)
+
+	print("Done. \n Ramachandran plot saved to", str(plot_name + '.' + file_type))
+
+	return result
 
 
 
@@ -170,9 +327,14 @@ def main(pdb, itmod, model_num, itchain, chain_num, plot_type, out_dir, verb, sa
 if __name__ == "__main__":
 
 	# Loading user's input arguments
-	pdb, itmod, model_num, itchain, chain_num, plot_type, out_dir, verb, save, file_type = CollctUserArgs()
-
-	main(pdb, itmod, model_num, itchain, chain_num, plot_type, out_dir, verb, save, file_type)
+	pdb, itmod, model_num, itchain, chain_num, plot_type, out_dir, verb, save, file_type, selection, shared_reference = CollctUserArgs()
+
+	try:
+		main(pdb, itmod, model_num, itchain, chain_num, plot_type, out_dir, verb, save, file_type, 
+														selection, shared_reference)
+	except RamachandranError as error:
+		print("\n  ERROR:", error, "\n")
+		sys.exit(1)
 
 else:
 	pass
\ No newline at end of file
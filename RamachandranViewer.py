@@ -0,0 +1,688 @@
+"""
+	====================================================================================
+	Locally served, interactive Ramachandran viewer for large collections of dihedral
+	angles (e.g. CSVs written with --save_csv across an entire structure database).
+
+	On start-up the angle table is indexed once:
+	 - Points are sorted along a Morton (Z-order) curve over the phi/psi square, so
+	   every quadtree tile at every zoom level is one contiguous slice of the table.
+	 - A multi-resolution pyramid of 2D histograms ("density tiles") is precomputed
+	   for all residues and for each residue type.
+
+	The browser only receives aggregated density tiles at coarse zoom. Raw points are
+	sent once the view is zoomed in far enough for a tile to hold few residues, and
+	clicking on a point fetches the full record of that residue. Chain and PDB filters
+	are applied to the relevant tile slice on request.
+
+	Usage:
+		python RamachandranViewer.py angles_1.csv angles_2.csv ... --port 8000
+
+	PDB files (.pdb/.ent) may also be given, their dihedral angles are calculated on
+	start-up with ExtractDihedrals().
+
+	Author information:
+	 - Joseph I. J. Ellaway
+	 - josephellaway@gmail.com
+	 - https://github.com/Joseph-Ellaway
+	====================================================================================
+"""
+
+import argparse
+import json
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from DihedralCalculator import ExtractDihedrals
+from RamaArgumentParser import VerboseStatement
+
+
+# Extra Morton levels beyond the density pyramid used to order points, so that tiles
+# zoomed in past the pyramid are still contiguous slices of the table.
+POINT_ORDER_LEVELS = 8
+
+
+
+def LoadAngleTable(file_names):
+	"""
+	====================================================================================
+	Reads dihedral angle tables (CSVs written by RamachandranPlotter.py --save_csv) or
+	PDB files into a single Pandas DataFrame. Residues without both angles are dropped.
+	====================================================================================
+	"""
+
+	tables = []
+
+	for file_name in file_names:
+
+		if file_name.lower().endswith((".csv", ".csv.gz")):
+			tables.append(pd.read_csv(file_name))
+		else:
+			tables.append(ExtractDihedrals(pdb_file_name=file_name))
+
+	angle_df = pd.concat(tables, ignore_index=True)
+	angle_df = angle_df.dropna(subset=["phi", "psi", "type"])
+
+	# Categorical columns keep millions of repeated labels compact in memory
+	for column in ["PDBCode", "chainID", "residueName", "type"]:
+		angle_df[column] = angle_df[column].astype(str).astype("category")
+
+	return angle_df.reset_index(drop=True)
+
+
+
+def AnglesToCells(angles, n_cells):
+	"""
+	====================================================================================
+	Maps angles (degrees, -180 to 180) onto integer cell indices of a grid with n_cells
+	cells spanning the full angle range.
+	====================================================================================
+	"""
+
+	cells = np.floor((np.asarray(angles, dtype=np.float64) + 180.0) / 360.0 * n_cells)
+
+	return np.clip(cells, 0, n_cells - 1).astype(np.int64)
+
+
+
+def MortonKey(x_cells, y_cells, n_bits):
+	"""
+	====================================================================================
+	Interleaves the bits of two integer cell index arrays into Morton (Z-order) keys.
+	All cells of a quadtree tile share a key prefix, so they are contiguous once sorted.
+	====================================================================================
+	"""
+
+	keys = np.zeros(len(x_cells), dtype=np.uint64)
+	x_cells = np.asarray(x_cells, dtype=np.uint64)
+	y_cells = np.asarray(y_cells, dtype=np.uint64)
+
+	for bit in range(n_bits):
+		keys |= ((x_cells >> np.uint64(bit)) & np.uint64(1)) << np.uint64(2 * bit)
+		keys |= ((y_cells >> np.uint64(bit)) & np.uint64(1)) << np.uint64(2 * bit + 1)
+
+	return keys
+
+
+
+def DensityPyramid(phis, psis, max_level, tile_bins):
+	"""
+	====================================================================================
+	Precomputes 2D histograms of phi/psi angles at every zoom level from 0 (one tile
+	covering the whole plot) to max_level (2^max_level tiles per side). Each tile holds
+	tile_bins x tile_bins counts. Coarser levels are made by summing 2x2 blocks of the
+	level below rather than re-binning the points.
+	====================================================================================
+	"""
+
+	n_cells = tile_bins * 2 ** max_level
+	finest = np.zeros((n_cells, n_cells), dtype=np.int64)
+
+	# Index as [phi cell, psi cell]
+	np.add.at(finest, (AnglesToCells(phis, n_cells), AnglesToCells(psis, n_cells)), 1)
+
+	pyramid = [finest]
+
+	for level in range(max_level):
+		grid = pyramid[0]
+		half = grid.shape[0] // 2
+		pyramid.insert(0, grid.reshape(half, 2, half, 2).sum(axis=(1, 3)))
+
+	return pyramid
+
+
+
+def BuildTileIndex(angle_df, max_level=4, tile_bins=64, max_points=4000):
+	"""
+	====================================================================================
+	Indexes an angle table for tiled serving. Returns a dictionary holding the Morton
+	sorted table, per-point arrays used for filtering and the density pyramids for all
+	residues and each residue type.
+	====================================================================================
+	"""
+
+	order_bits = max_level + POINT_ORDER_LEVELS
+	n_order_cells = 2 ** order_bits
+
+	# Keys are made from the same (float32) angles that tiles are binned from, so a point
+	# near a tile edge is always sliced into the tile it is binned in
+	phis = angle_df["phi"].to_numpy(dtype=np.float32)
+	psis = angle_df["psi"].to_numpy(dtype=np.float32)
+
+	keys = MortonKey(AnglesToCells(phis, n_order_cells), AnglesToCells(psis, n_order_cells),
+																		order_bits)
+	order = np.argsort(keys, kind="stable")
+
+	angle_df = angle_df.iloc[order].reset_index(drop=True)
+
+	index = {
+		"table" : angle_df,
+		"keys" : keys[order],
+		"order_bits" : order_bits,
+		"phi" : phis[order],
+		"psi" : psis[order],
+		"type_codes" : angle_df["type"].cat.codes.to_numpy(),
+		"chain_codes" : angle_df["chainID"].cat.codes.to_numpy(),
+		"pdb_codes" : angle_df["PDBCode"].cat.codes.to_numpy(),
+		"max_level" : max_level,
+		"tile_bins" : tile_bins,
+		"max_points" : max_points,
+		"pyramids" : {}
+		}
+
+	index["pyramids"]["All"] = DensityPyramid(index["phi"], index["psi"], max_level,
+																			tile_bins)
+
+	for residue_type in angle_df["type"].cat.categories:
+		type_mask = (angle_df["type"] == residue_type).to_numpy()
+		index["pyramids"][residue_type] = DensityPyramid(index["phi"][type_mask],
+										index["psi"][type_mask], max_level, tile_bins)
+
+	return index
+
+
+
+def TileSlice(index, level, x, y):
+	"""
+	====================================================================================
+	Returns the (start, stop) row range of the sorted table covered by a quadtree tile.
+	====================================================================================
+	"""
+
+	shift = np.uint64(2 * (index["order_bits"] - level))
+	tile_key = MortonKey([x], [y], level)[0]
+
+	start = np.searchsorted(index["keys"], tile_key << shift, side="left")
+	stop = np.searchsorted(index["keys"], (tile_key + np.uint64(1)) << shift, side="left")
+
+	return int(start), int(stop)
+
+
+
+def FilterMask(index, start, stop, filters):
+	"""
+	====================================================================================
+	Returns a boolean mask over rows [start, stop) for the requested residue type, chain
+	IDs and PDB codes. Returns None if no filter applies.
+	====================================================================================
+	"""
+
+	table = index["table"]
+	mask = None
+
+	for column, codes_key in [("type", "type_codes"), ("chainID", "chain_codes"),
+																("PDBCode", "pdb_codes")]:
+		values = filters.get(column)
+
+		if not values:
+			continue
+
+		categories = table[column].cat.categories
+		wanted = [categories.get_loc(value) for value in values if value in categories]
+		column_mask = np.isin(index[codes_key][start:stop], wanted)
+
+		mask = column_mask if mask is None else mask & column_mask
+
+	return mask
+
+
+
+def DensityTile(index, level, x, y, filters):
+	"""
+	====================================================================================
+	Returns a tile_bins x tile_bins array of counts (indexed [psi bin, phi bin]) for a
+	tile. Precomputed pyramids are used where possible (all residues or a single residue
+	type), otherwise the tile's slice of the table is binned on request.
+	====================================================================================
+	"""
+
+	tile_bins = index["tile_bins"]
+	residue_types = filters.get("type") or ["All"]
+	other_filters = filters.get("chainID") or filters.get("PDBCode")
+
+	if (level <= index["max_level"] and not other_filters and len(residue_types) == 1
+									and residue_types[0] in index["pyramids"]):
+		grid = index["pyramids"][residue_types[0]][level]
+		counts = grid[x * tile_bins:(x + 1) * tile_bins, y * tile_bins:(y + 1) * tile_bins]
+
+		return counts.T
+
+	start, stop = TileSlice(index, level, x, y)
+	mask = FilterMask(index, start, stop, filters)
+
+	phis = index["phi"][start:stop]
+	psis = index["psi"][start:stop]
+
+	if mask is not None:
+		phis = phis[mask]
+		psis = psis[mask]
+
+	n_cells = tile_bins * 2 ** level
+
+	# Guards against rounding at tile edges when tile_bins is not a power of two
+	phi_cells = np.clip(AnglesToCells(phis, n_cells) - x * tile_bins, 0, tile_bins - 1)
+	psi_cells = np.clip(AnglesToCells(psis, n_cells) - y * tile_bins, 0, tile_bins - 1)
+
+	counts = np.bincount(psi_cells * tile_bins + phi_cells, minlength=tile_bins ** 2)
+
+	return counts.reshape(tile_bins, tile_bins)
+
+
+
+def TileResponse(index, level, x, y, filters):
+	"""
+	====================================================================================
+	Builds the JSON-serialisable response for a tile. Coarse zoom levels always return
+	aggregated counts. Past the density pyramid, raw points (row id, phi, psi) are
+	returned if the filtered tile holds no more than max_points residues.
+	====================================================================================
+	"""
+
+	if level > index["max_level"]:
+
+		start, stop = TileSlice(index, level, x, y)
+		mask = FilterMask(index, start, stop, filters)
+		rows = np.arange(start, stop)
+
+		if mask is not None:
+			rows = rows[mask]
+
+		if len(rows) <= index["max_points"]:
+			return {
+				"kind" : "points",
+				"ids" : rows.tolist(),
+				"phi" : index["phi"][rows].round(2).tolist(),
+				"psi" : index["psi"][rows].round(2).tolist()
+				}
+
+	counts = DensityTile(index, level, x, y, filters)
+
+	return {
+		"kind" : "density",
+		"bins" : index["tile_bins"],
+		"counts" : counts.ravel().tolist()
+		}
+
+
+
+def ResidueRecord(index, row_id):
+	"""
+	====================================================================================
+	Returns the full table row of a single residue as a dictionary.
+	====================================================================================
+	"""
+
+	record = index["table"].iloc[row_id].to_dict()
+
+	return {key : (value.item() if hasattr(value, "item") else value)
+													for key, value in record.items()}
+
+
+
+def ViewerMetadata(index):
+	"""
+	====================================================================================
+	Summary of the indexed table used to populate the viewer's filter controls.
+	====================================================================================
+	"""
+
+	table = index["table"]
+
+	return {
+		"residues" : len(table),
+		"types" : list(table["type"].cat.categories),
+		"chains" : len(table["chainID"].cat.categories),
+		"pdbs" : len(table["PDBCode"].cat.categories),
+		"max_level" : index["max_level"],
+		"max_zoom" : index["order_bits"],
+		"tile_bins" : index["tile_bins"]
+		}
+
+
+
+def ParseFilters(query):
+	"""
+	====================================================================================
+	Reads residue type, chain and PDB filters (comma separated) from a URL query.
+	====================================================================================
+	"""
+
+	filters = {}
+
+	for column, parameter in [("type", "type"), ("chainID", "chain"), ("PDBCode", "pdb")]:
+		values = ",".join(query.get(parameter, [])).split(",")
+		values = [value.strip() for value in values if value.strip()]
+
+		if values and values != ["All"]:
+			filters[column] = values
+
+	return filters
+
+
+
+class ViewerRequestHandler(BaseHTTPRequestHandler):
+	"""
+	====================================================================================
+	Serves the viewer page, tile requests and residue look-ups from a tile index.
+	====================================================================================
+	"""
+
+	def __init__(self, *args, index=None, **kwargs):
+		self.index = index
+		super().__init__(*args, **kwargs)
+
+	def log_message(self, format, *args):
+		pass
+
+	def SendBody(self, body, content_type):
+		body = body.encode("utf-8")
+		self.send_response(200)
+		self.send_header("Content-Type", content_type)
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def do_GET(self):
+		url = urlparse(self.path)
+		query = parse_qs(url.query)
+
+		try:
+			if url.path == "/":
+				self.SendBody(VIEWER_PAGE, "text/html; charset=utf-8")
+
+			elif url.path == "/meta":
+				self.SendBody(json.dumps(ViewerMetadata(self.index)), "application/json")
+
+			elif url.path == "/tile":
+				level = int(query["z"][0])
+				x = int(query["x"][0])
+				y = int(query["y"][0])
+
+				# Tiles past order_bits are finer than the Morton keys of the table
+				if not 0 <= level <= self.index["order_bits"]:
+					raise ValueError("Zoom level out of range")
+
+				if not (0 <= x < 2 ** level and 0 <= y < 2 ** level):
+					raise ValueError("Tile out of range")
+
+				tile = TileResponse(self.index, level, x, y, ParseFilters(query))
+				self.SendBody(json.dumps(tile), "application/json")
+
+			elif url.path == "/residue":
+				record = ResidueRecord(self.index, int(query["id"][0]))
+				self.SendBody(json.dumps(record), "application/json")
+
+			else:
+				self.send_error(404)
+
+		except (KeyError, ValueError, IndexError) as error:
+			self.send_error(400, str(error))
+
+
+
+def ServeViewer(index, host="127.0.0.1", port=8000):
+	"""
+	====================================================================================
+	Serves the viewer for a tile index until interrupted.
+	====================================================================================
+	"""
+
+	server = ThreadingHTTPServer((host, port), partial(ViewerRequestHandler, index=index))
+
+	print("Ramachandran viewer running at http://{}:{}/".format(host, port))
+
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+
+
+
+VIEWER_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Ramachandran Viewer</title>
+<style>
+	body { font-family: sans-serif; margin: 16px; }
+	#controls { margin-bottom: 8px; }
+	#controls label { margin-right: 12px; }
+	#plot { border: 1px solid #3c3c3c; cursor: grab; }
+	#residue { display: inline-block; vertical-align: top; margin-left: 16px; }
+</style>
+</head>
+<body>
+<div id="controls">
+	<label>Type <select id="type"><option>All</option></select></label>
+	<label>Chains <input id="chain" size="8" placeholder="A,B"></label>
+	<label>PDB codes <input id="pdb" size="16" placeholder="all"></label>
+	<button id="reset">Reset view</button>
+	<span id="summary"></span>
+</div>
+<canvas id="plot" width="640" height="640"></canvas>
+<pre id="residue">Zoom in and click a point for residue details.</pre>
+<script>
+const canvas = document.getElementById("plot");
+const ctx = canvas.getContext("2d");
+const SIZE = canvas.width;
+const BASE_SCALE = SIZE / 360;
+const tiles = new Map();
+let view = {cx: 0, cy: 0, scale: BASE_SCALE};
+let meta = null;
+let drawnPoints = [];
+
+function filterQuery() {
+	return "&type=" + encodeURIComponent(document.getElementById("type").value) +
+		"&chain=" + encodeURIComponent(document.getElementById("chain").value) +
+		"&pdb=" + encodeURIComponent(document.getElementById("pdb").value);
+}
+
+function toScreen(phi, psi) {
+	return [SIZE / 2 + (phi - view.cx) * view.scale, SIZE / 2 - (psi - view.cy) * view.scale];
+}
+
+function toWorld(px, py) {
+	return [view.cx + (px - SIZE / 2) / view.scale, view.cy - (py - SIZE / 2) / view.scale];
+}
+
+function zoomLevel() {
+	return Math.max(0, Math.floor(Math.log2(view.scale / BASE_SCALE)));
+}
+
+function visibleTiles() {
+	const z = zoomLevel();
+	const n = 2 ** z;
+	const span = 360 / n;
+	const [left, top] = toWorld(0, 0);
+	const [right, bottom] = toWorld(SIZE, SIZE);
+	const clip = v => Math.min(n - 1, Math.max(0, v));
+	const out = [];
+	for (let x = clip(Math.floor((left + 180) / span)); x <= clip(Math.floor((right + 180) / span)); x++) {
+		for (let y = clip(Math.floor((bottom + 180) / span)); y <= clip(Math.floor((top + 180) / span)); y++) {
+			out.push({z: z, x: x, y: y, span: span});
+		}
+	}
+	return out;
+}
+
+function fetchTile(t) {
+	const key = t.z + "/" + t.x + "/" + t.y + filterQuery();
+	if (!tiles.has(key)) {
+		tiles.set(key, null);
+		fetch("/tile?z=" + t.z + "&x=" + t.x + "&y=" + t.y + filterQuery())
+			.then(r => r.ok ? r.json() : Promise.reject(r.status))
+			.then(data => { tiles.set(key, data); draw(); })
+			.catch(() => tiles.delete(key));
+	}
+	return tiles.get(key);
+}
+
+function densityImage(data, maxLog) {
+	const n = data.bins;
+	const image = document.createElement("canvas");
+	image.width = n; image.height = n;
+	const pixels = image.getContext("2d").createImageData(n, n);
+	for (let j = 0; j < n; j++) {
+		for (let i = 0; i < n; i++) {
+			const c = data.counts[j * n + i];
+			const p = 4 * ((n - 1 - j) * n + i);
+			const v = c > 0 ? Math.log1p(c) / maxLog : 0;
+			pixels.data[p] = 255 - 251 * v;
+			pixels.data[p + 1] = 255 - 161 * v;
+			pixels.data[p + 2] = 255 - 108 * v;
+			pixels.data[p + 3] = c > 0 ? 255 : 0;
+		}
+	}
+	image.getContext("2d").putImageData(pixels, 0, 0);
+	return image;
+}
+
+function draw() {
+	ctx.clearRect(0, 0, SIZE, SIZE);
+	drawnPoints = [];
+	const visible = visibleTiles().map(t => [t, fetchTile(t)]).filter(p => p[1]);
+	let maxLog = 1;
+	for (const [t, data] of visible) {
+		if (data.kind === "density") {
+			for (const c of data.counts) { maxLog = Math.max(maxLog, Math.log1p(c)); }
+		}
+	}
+	ctx.imageSmoothingEnabled = false;
+	for (const [t, data] of visible) {
+		const [sx, sy] = toScreen(-180 + t.x * t.span, -180 + (t.y + 1) * t.span);
+		const side = t.span * view.scale;
+		if (data.kind === "density") {
+			ctx.drawImage(densityImage(data, maxLog), sx, sy, side, side);
+		} else {
+			ctx.fillStyle = "#D4AB2D";
+			ctx.strokeStyle = "#3c3c3c";
+			for (let k = 0; k < data.ids.length; k++) {
+				const [px, py] = toScreen(data.phi[k], data.psi[k]);
+				ctx.beginPath(); ctx.arc(px, py, 3, 0, 2 * Math.PI); ctx.fill(); ctx.stroke();
+				drawnPoints.push([px, py, data.ids[k]]);
+			}
+		}
+	}
+	ctx.strokeStyle = "rgba(128, 128, 128, 0.6)";
+	ctx.setLineDash([4, 4]);
+	for (let g = -180; g <= 180; g += 60) {
+		let [gx, gy] = toScreen(g, g);
+		ctx.beginPath(); ctx.moveTo(gx, 0); ctx.lineTo(gx, SIZE); ctx.stroke();
+		ctx.beginPath(); ctx.moveTo(0, gy); ctx.lineTo(SIZE, gy); ctx.stroke();
+	}
+	ctx.setLineDash([]);
+}
+
+let drag = null;
+canvas.addEventListener("mousedown", e => { drag = {x: e.offsetX, y: e.offsetY, moved: false}; });
+canvas.addEventListener("mousemove", e => {
+	if (!drag) { return; }
+	const dx = e.offsetX - drag.x, dy = e.offsetY - drag.y;
+	if (Math.abs(dx) + Math.abs(dy) > 2) { drag.moved = true; }
+	view.cx -= dx / view.scale; view.cy += dy / view.scale;
+	drag.x = e.offsetX; drag.y = e.offsetY;
+	draw();
+});
+canvas.addEventListener("mouseup", e => {
+	if (drag && !drag.moved) { selectResidue(e.offsetX, e.offsetY); }
+	drag = null;
+});
+canvas.addEventListener("wheel", e => {
+	e.preventDefault();
+	const [wx, wy] = toWorld(e.offsetX, e.offsetY);
+	const maxScale = BASE_SCALE * 2 ** (meta ? meta.max_zoom : 0);
+	view.scale = Math.min(maxScale, Math.max(BASE_SCALE, view.scale * (e.deltaY < 0 ? 1.25 : 0.8)));
+	view.cx = wx - (e.offsetX - SIZE / 2) / view.scale;
+	view.cy = wy + (e.offsetY - SIZE / 2) / view.scale;
+	draw();
+});
+
+function selectResidue(px, py) {
+	let best = null, bestDist = 36;
+	for (const [x, y, id] of drawnPoints) {
+		const d = (x - px) ** 2 + (y - py) ** 2;
+		if (d < bestDist) { best = id; bestDist = d; }
+	}
+	if (best !== null) {
+		fetch("/residue?id=" + best).then(r => r.json()).then(record => {
+			document.getElementById("residue").textContent = JSON.stringify(record, null, 2);
+		});
+	}
+}
+
+for (const id of ["type", "chain", "pdb"]) {
+	document.getElementById(id).addEventListener("change", () => { tiles.clear(); draw(); });
+}
+document.getElementById("reset").addEventListener("click", () => {
+	view = {cx: 0, cy: 0, scale: BASE_SCALE}; draw();
+});
+
+fetch("/meta").then(r => r.json()).then(m => {
+	meta = m;
+	const select = document.getElementById("type");
+	for (const t of m.types) { const o = document.createElement("option"); o.textContent = t; select.appendChild(o); }
+	document.getElementById("summary").textContent =
+		m.residues + " residues, " + m.pdbs + " structures";
+	draw();
+});
+</script>
+</body>
+</html>
+"""
+
+
+
+def CollectViewerArgs():
+	"""
+	====================================================================================
+	Collects the viewer's input arguments from the command line.
+	====================================================================================
+	"""
+
+	parser = argparse.ArgumentParser()
+
+	parser.add_argument("tables", nargs="+",
+						help="Dihedral angle CSVs (from --save_csv) and/or PDB files.")
+
+	parser.add_argument("-v", "--verbose", help="Increase output verbosity",
+						action="store_true")
+
+	parser.add_argument("--host", help="Address to serve on (default: 127.0.0.1).",
+						type=str, default="127.0.0.1")
+
+	parser.add_argument("--port", help="Port to serve on (default: 8000).",
+						type=int, default=8000)
+
+	parser.add_argument("--levels",
+						help="Zoom levels with precomputed density tiles (default: 4).",
+						type=int, default=4)
+
+	parser.add_argument("--tile_bins",
+						help="Histogram bins along each side of a density tile (default: 64).",
+						type=int, default=64)
+
+	parser.add_argument("--max_points",
+						help="Largest number of raw points sent for one tile (default: 4000).",
+						type=int, default=4000)
+
+	return parser.parse_args()
+
+
+
+if __name__ == "__main__":
+
+	args = CollectViewerArgs()
+
+	VerboseStatement(args.verbose, "Loading dihedral angle tables")
+	angle_df = LoadAngleTable(args.tables)
+
+	VerboseStatement(args.verbose, str("Indexing " + str(len(angle_df)) + " residues"))
+	tile_index = BuildTileIndex(angle_df, max_level=args.levels, tile_bins=args.tile_bins,
+													max_points=args.max_points)
+
+	ServeViewer(tile_index, host=args.host, port=args.port)
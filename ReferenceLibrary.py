@@ -0,0 +1,307 @@
+"""
+	====================================================================================
+	Top8000 reference data used to draw and score Ramachandran plots: the reference
+	angles for each plot type, the 2D histogram behind the contour lines and the
+	smoothed background image of favoured regions.
+
+	Building this data (reading the Top8000 CSV, binning and smoothing the background)
+	is the slowest part of making a plot. Within one process it is built once per plot
+	type and cached. When many plotter processes run on one node, it can instead be
+	published once into a memory-mapped file:
+
+		python ReferenceLibrary.py --out /dev/shm/rama_reference.bin
+
+	which worker processes attach to (e.g. RamachandranPlotter.py --shared_reference
+	/dev/shm/rama_reference.bin). Attached arrays are read-only views of the file, so
+	all workers share a single copy in the page cache and start without rebuilding
+	anything.
+
+	Author information:
+	 - Joseph I. J. Ellaway
+	 - josephellaway@gmail.com
+	 - https://github.com/Joseph-Ellaway
+	====================================================================================
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from DihedralCalculator import RamachandranError
+from PlotterFunctions import ContourCounts, MakeBackground, SelectAngles
+
+
+# Available plots. User input (--plot_type) indexes this list.
+PLOT_TYPES = ["All", "General", "Glycine", "Proline", "Pre-proline", "Ile-Val"]
+
+# Top8000 peptide dataset. Pre-analysed
+TOP8000_FILE = "Top8000_DihedralAngles.csv.gz"
+
+# Array fields of ReferenceData, in the order they are written to a shared file
+REFERENCE_ARRAYS = ["phi", "psi", "contour_counts", "phi_edges", "psi_edges", "background"]
+
+# Shared files start with this tag, followed by the length of the JSON manifest
+SHARED_FILE_TAG = b"RAMAREF1"
+
+# Byte alignment of arrays in shared files
+SHARED_ALIGNMENT = 64
+
+# Reference data built or attached in this process, with a lock per entry so that
+# threads asking for the same entry at once wait for a single build
+_REFERENCE_CACHE = {}
+_REFERENCE_LOCKS = {}
+_REFERENCE_LOCKS_LOCK = threading.Lock()
+
+
+
+@dataclass(frozen=True)
+class ReferenceData:
+	"""
+	====================================================================================
+	Top8000 reference angles for one plot type, along with everything derived from them
+	that is shared between plots: contour/scoring histogram and background image.
+	====================================================================================
+	"""
+	plot_type: str
+	phi: np.ndarray
+	psi: np.ndarray
+	contour_counts: np.ndarray
+	phi_edges: np.ndarray
+	psi_edges: np.ndarray
+	background: np.ndarray
+
+
+
+def BuildReferenceData(top8000_df, plot_type, background_colour="Blues"):
+	"""
+	====================================================================================
+	Selects the Top8000 angles for a plot type and precomputes the contour histogram and
+	smoothed background image.
+	====================================================================================
+	"""
+
+	top8000_df = SelectAngles(top8000_df, plot_type)
+
+	contour_counts, phi_edges, psi_edges = ContourCounts(top8000_df)
+
+	background = MakeBackground(top8000_df, background_colour)
+
+	reference = ReferenceData(plot_type=plot_type,
+							phi=top8000_df["phi"].to_numpy(dtype=np.float64),
+							psi=top8000_df["psi"].to_numpy(dtype=np.float64),
+							contour_counts=contour_counts,
+							phi_edges=phi_edges,
+							psi_edges=psi_edges,
+							background=background)
+
+	for field in REFERENCE_ARRAYS:
+		getattr(reference, field).setflags(write=False)
+
+	return reference
+
+
+
+def CachedReference(key, build):
+	"""
+	====================================================================================
+	Returns the cached result for key, calling build() to make it on the first request. 
+	Threads requesting the same key at once wait for the first one's build rather than 
+	repeating it. Builds that raise are not cached. 
+	====================================================================================
+	"""
+
+	with _REFERENCE_LOCKS_LOCK:
+		lock = _REFERENCE_LOCKS.setdefault(key, threading.Lock())
+
+	with lock:
+		if key not in _REFERENCE_CACHE:
+			_REFERENCE_CACHE[key] = build()
+
+	return _REFERENCE_CACHE[key]
+
+
+
+def LoadReferenceData(plot_type, background_colour="Blues", reference_file=TOP8000_FILE):
+	"""
+	====================================================================================
+	Reads Top8000 angles and builds the reference data for a plot type. Results are
+	cached, so repeated plots in one process (including from multiple threads) only
+	build them once.
+	====================================================================================
+	"""
+
+	def Build():
+		top8000_df = pd.read_csv(reference_file, compression="gzip")
+		return BuildReferenceData(top8000_df, plot_type, background_colour)
+
+	return CachedReference(("load", plot_type, background_colour, reference_file), Build)
+
+
+
+def PublishReferenceData(out_file_name, plot_types=PLOT_TYPES, background_colour="Blues",
+													reference_file=TOP8000_FILE):
+	"""
+	====================================================================================
+	Builds the reference data for each plot type and writes it to a single file laid out
+	for memory mapping: a JSON manifest of array names, data types, shapes and offsets,
+	followed by the aligned raw arrays. The file is written under a temporary name and
+	then renamed, so workers never attach to a partly written file.
+	====================================================================================
+	"""
+
+	top8000_df = pd.read_csv(reference_file, compression="gzip")
+
+	references = [BuildReferenceData(top8000_df, plot_type, background_colour)
+													for plot_type in plot_types]
+
+	# Array offsets are relative to the start of the data, which follows the manifest
+	manifest = {"background_colour" : background_colour, "plot_types" : {}}
+	arrays = []
+	offset = 0
+
+	for reference in references:
+		entries = {}
+
+		for field in REFERENCE_ARRAYS:
+			array = np.ascontiguousarray(getattr(reference, field))
+			offset = -(-offset // SHARED_ALIGNMENT) * SHARED_ALIGNMENT
+			entries[field] = {"dtype" : array.dtype.str, "shape" : list(array.shape),
+																	"offset" : offset}
+			arrays.append((offset, array))
+			offset += array.nbytes
+
+		manifest["plot_types"][reference.plot_type] = entries
+
+	manifest_bytes = json.dumps(manifest).encode("utf-8")
+	header_size = len(SHARED_FILE_TAG) + 8 + len(manifest_bytes)
+	data_start = -(-header_size // SHARED_ALIGNMENT) * SHARED_ALIGNMENT
+
+	out_dir = os.path.dirname(os.path.abspath(out_file_name))
+	tmp_fd, tmp_file_name = tempfile.mkstemp(dir=out_dir, prefix=".rama_reference_")
+
+	try:
+		with os.fdopen(tmp_fd, "wb") as out_file:
+			out_file.write(SHARED_FILE_TAG)
+			out_file.write(len(manifest_bytes).to_bytes(8, "little"))
+			out_file.write(manifest_bytes)
+
+			for array_offset, array in arrays:
+				out_file.seek(data_start + array_offset)
+				out_file.write(array.tobytes())
+
+		# Readable by worker processes of other users
+		os.chmod(tmp_file_name, 0o644)
+		os.replace(tmp_file_name, out_file_name)
+
+	except BaseException:
+		os.remove(tmp_file_name)
+		raise
+
+	return out_file_name
+
+
+
+def AttachReferenceData(shared_file_name):
+	"""
+	====================================================================================
+	Memory-maps a file written by PublishReferenceData() and returns a dictionary of
+	plot type to ReferenceData. Arrays are read-only views of the mapped file, so no
+	reference data is copied into the process. Cached, so each process maps a file once.
+	====================================================================================
+	"""
+
+	return CachedReference(("attach", shared_file_name), 
+										lambda: MapReferenceFile(shared_file_name))
+
+
+
+def MapReferenceFile(shared_file_name):
+	"""
+	====================================================================================
+	Memory-maps a shared reference file and reads its manifest. See 
+	AttachReferenceData(). 
+	====================================================================================
+	"""
+
+	try:
+		mapped = np.memmap(shared_file_name, dtype=np.uint8, mode="r")
+	except (OSError, ValueError) as error:
+		raise RamachandranError(str("Invalid shared reference file: " 
+												+ str(shared_file_name))) from error
+
+	tag_size = len(SHARED_FILE_TAG)
+
+	if bytes(mapped[:tag_size]) != SHARED_FILE_TAG:
+		raise RamachandranError(str("Not a shared reference file: " + str(shared_file_name)))
+
+	manifest_size = int.from_bytes(bytes(mapped[tag_size:tag_size + 8]), "little")
+	manifest = json.loads(bytes(mapped[tag_size + 8:tag_size + 8 + manifest_size]))
+
+	header_size = tag_size + 8 + manifest_size
+	data_start = -(-header_size // SHARED_ALIGNMENT) * SHARED_ALIGNMENT
+
+	references = {}
+
+	for plot_type, entries in manifest["plot_types"].items():
+		arrays = {}
+
+		for field, entry in entries.items():
+			dtype = np.dtype(entry["dtype"])
+			count = int(np.prod(entry["shape"], dtype=np.int64))
+			start = data_start + entry["offset"]
+			arrays[field] = np.frombuffer(mapped, dtype=dtype, count=count,
+											offset=start).reshape(entry["shape"])
+
+		references[plot_type] = ReferenceData(plot_type=plot_type, **arrays)
+
+	return references
+
+
+
+def SharedReferenceData(shared_file_name, plot_type):
+	"""
+	====================================================================================
+	Returns the ReferenceData of one plot type from a shared reference file (see 
+	AttachReferenceData()). Raises RamachandranError if the file was published without 
+	that plot type. 
+	====================================================================================
+	"""
+
+	references = AttachReferenceData(shared_file_name)
+
+	if plot_type not in references:
+		raise RamachandranError(str("Shared reference file " + str(shared_file_name) 
+									+ " has no " + str(plot_type) + " reference data"))
+
+	return references[plot_type]
+
+
+
+if __name__ == "__main__":
+
+	parser = argparse.ArgumentParser()
+
+	parser.add_argument("-o", "--out",
+						help="Shared reference file to write, e.g. /dev/shm/rama_reference.bin",
+						type=str, required=True)
+
+	parser.add_argument("--reference_file",
+						help="Top8000 dihedral angles (default: Top8000_DihedralAngles.csv.gz).",
+						type=str, default=TOP8000_FILE)
+
+	parser.add_argument("--background_colour",
+						help="Colour map of the background (default: Blues).",
+						type=str, default="Blues")
+
+	args = parser.parse_args()
+
+	PublishReferenceData(args.out, background_colour=args.background_colour,
+											reference_file=args.reference_file)
+
+	print("Done. \n Shared reference data saved to", args.out)